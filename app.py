@@ -4,21 +4,28 @@ Smart Mirror Backend Server
 1. Provides webpage routes for the Smart Mirror UI
 2. Serves backend data for stocks, sports, Spotify, and Google Calendar
 3. Caches API responses to limit frequent requests
-4. Built with Flask
+4. Built with Flask (served by gunicorn in production, see gunicorn.conf.py)
 '''
 
 #import libraries and modules
-from flask import Flask, render_template, jsonify, request, redirect
-import time
+from flask import Flask, render_template, jsonify, request, redirect, Response, send_file, abort, url_for
+import time, threading, random
 from datetime import datetime, time as dt_time, timedelta, date
-import pytz, os, requests
+import pytz, os, json, socket, hashlib, mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from spotipy import Spotify
 from spotipy.oauth2 import SpotifyOAuth
+from spotipy.cache_handler import CacheFileHandler
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from google.auth.transport.requests import Request
+from cache_store import open_cache_store, make_key, TimeSeriesStore
+from quota import QuotaBudget, QuotaExceeded, TokenBucket
+from upstream_session import open_upstream_session, mount_host, HostPolicy
+from assets import build_assets, asset_variant, served_assets
+from compression import CompressionCache, ENCODINGS, compress, pick_encoding
 
 #initialize flask
 app = Flask(__name__)
@@ -26,17 +33,491 @@ app = Flask(__name__)
 #load env vars from .env file
 load_dotenv()
 
-#prevent caching after every request from remote to always show updated data
+'''
+HTTP Cache Policies
+1. Pages and control routes (/mirror, /remote, /current_page, /set_page, ...) are never cached so they always show updated data
+2. Plain static files are linked as /static/<file>?v=<content hash> (added to every url_for('static', ...))
+   - the asset pipeline below serves content-hashed copies instead, these are the fallback
+   - a changed file gets a new URL, so versioned URLs are cached by the browser for a year
+   - unversioned static URLs keep Flask's default: revalidate every time (ETag / Last-Modified)
+3. JSON data routes answer through data_response: ETag + "no-cache", an unchanged payload gets 304 with no body
+   - bodies over JSON_COMPRESS_MIN_SIZE are sent gzip/brotli compressed if the client accepts it
+   - compressed copies are cached by payload version, so a payload is compressed once, not on every poll
+   - cached payloads (stocks, sports, calendar) skip this and send a response prepared at refresh time (see below)
+'''
+STATIC_MAX_AGE = 31536000  # seconds
+
+#content hash per static file, recomputed only when the file changes on disk
+static_versions = {}
+
+def static_version(filename):
+    path = os.path.join(app.static_folder, filename)
+    mtime = os.path.getmtime(path)
+    cached = static_versions.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = (mtime, hashlib.md5(f.read()).hexdigest()[:10])
+        static_versions[filename] = cached
+    return cached[1]
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    #url_for('static', filename=...) -> /static/<file>?v=<hash>
+    if endpoint != 'static' or 'v' in values:
+        return
+    try:
+        values['v'] = static_version(values['filename'])
+    except OSError:
+        #missing file: leave the URL unversioned (it will 404 like before)
+        pass
+
+def current_static_version():
+    #?v= of this static request matches the file on disk right now
+    try:
+        return request.args['v'] == static_version(request.view_args['filename'])
+    except (OSError, KeyError, TypeError):
+        return False
+
 @app.after_request
 def add_header(response):
+    #versioned static files never change under the same URL
+    #(only a 200 for the file's current hash: a 404 or an outdated ?v= must not be kept for a year)
+    if request.endpoint == 'static' and 'v' in request.args and response.status_code == 200 and current_static_version():
+        response.headers["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}, immutable"
+        return response
+    #routes that set their own policy (static files, data routes) keep it
+    if "Cache-Control" in response.headers:
+        return response
+    #prevent caching pages and control routes from remote to always show updated data
     response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     return response
 
+#JSON bodies smaller than this are sent as is (compressing them saves less than it costs)
+JSON_COMPRESS_MIN_SIZE = int(os.getenv("JSON_COMPRESS_MIN_SIZE", 1024))  # bytes
+json_compression = CompressionCache()
+
+def negotiate_compression(body, version, accept_encoding):
+    #(body, encoding) to send: the cached compressed copy if the client takes one and the body is big enough
+    if len(body) < JSON_COMPRESS_MIN_SIZE:
+        return body, None
+    encoding = pick_encoding(accept_encoding)
+    if encoding is None:
+        return body, None
+    return json_compression.get(version, encoding, body), encoding
+
+def data_response(data):
+    #JSON with an ETag of the body, If-None-Match with the same ETag gets 304 and no body
+    response = jsonify(data)
+    #browser may keep it, but has to revalidate on every poll
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Accept-Encoding"
+
+    #payload version: same data -> same hash -> compressed copy comes from json_compression
+    body = response.get_data()
+    version = hashlib.sha1(body).hexdigest()
+    body, encoding = negotiate_compression(body, version, request.headers.get('Accept-Encoding'))
+    if encoding is not None:
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        #each encoding is its own representation, so it gets its own ETag
+        version = f"{version}-{encoding}"
+    response.set_etag(version)
+    return response.make_conditional(request)
+
+'''
+Prepared JSON Responses
+1. When a cached source refreshes, its route payload is built right away (in the prefetch thread):
+   serialized once, hashed for the ETag and compressed into every encoding the server supports
+   - fast compression levels: this runs on every refresh (and on the first hit of restored data), best levels cost ~60x more
+   - a refresh that serializes to the same bytes as before keeps the previous compressed copies (nothing is recompressed)
+2. Route hits pick the prebuilt bytes for the client's Accept-Encoding: no jsonify, no hashing, no compressing per request
+3. A prepared payload remembers the exact data objects it was built from, anything else (new data, a fallback,
+   data restored from disk on boot) is prepared on the first request that sees it and reused after that
+4. Payloads that depend on the request (ex. /stocks_data?window=1m, /spotify_data) still go through data_response
+'''
+class PreparedJSON:
+    def __init__(self, sources, body, etag):
+        #the data objects this payload was built from (compared by identity, never by value)
+        self.sources = sources
+        self.etag = etag
+        #encoding -> (body, ETag), None is the uncompressed body
+        self.variants = {None: (body, etag)}
+        if len(body) >= JSON_COMPRESS_MIN_SIZE:
+            for encoding in ENCODINGS:
+                self.variants[encoding] = (compress(body, encoding, fast=True), f"{etag}-{encoding}")
+        self.encodings = [encoding for encoding in ENCODINGS if encoding in self.variants]
+
+    def matches(self, sources):
+        return len(sources) == len(self.sources) and all(a is b for a, b in zip(sources, self.sources))
+
+    def variant(self, accept_encoding):
+        #(body, ETag, encoding) for this client
+        encoding = pick_encoding(accept_encoding, self.encodings)
+        body, etag = self.variants[encoding]
+        return body, etag, encoding
+
+    def response(self):
+        body, etag, encoding = self.variant(request.headers.get('Accept-Encoding'))
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(body, mimetype='application/json')
+            if encoding is not None:
+                response.headers["Content-Encoding"] = encoding
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["Vary"] = "Accept-Encoding"
+        response.set_etag(etag)
+        return response
+
+#route name -> PreparedJSON for the data it last served
+prepared_payloads = {}
+
+def prepare_payload(name, sources, build):
+    #build: returns the payload made from sources (a tuple of the data objects it uses)
+    #same bytes jsonify would send
+    body = app.json.dumps(build(), separators=(',', ':')).encode() + b'\n'
+    etag = hashlib.sha1(body).hexdigest()
+    prepared = prepared_payloads.get(name)
+    if prepared is not None and prepared.etag == etag:
+        #unchanged payload: point the existing bytes at the new data objects
+        prepared.sources = sources
+        return prepared
+    prepared = PreparedJSON(sources, body, etag)
+    prepared_payloads[name] = prepared
+    return prepared
+
+def prepared_payload(name, sources, build):
+    prepared = prepared_payloads.get(name)
+    if prepared is None or not prepared.matches(sources):
+        prepared = prepare_payload(name, sources, build)
+    return prepared
+
+'''
+Static Asset Pipeline (assets.py)
+1. On startup every file in static/ is copied to static/dist/ under a content-hashed name, CSS minified
+2. Each module page's scripts are bundled into one file (ASSET_BUNDLES)
+3. Text assets are precompressed (gzip, brotli if installed), /assets/<file> sends the best variant the browser accepts
+4. Hashed names never change content, so they are cached for a year and the kiosk browser cache never has to be wiped
+5. Templates link assets with asset_url('style.css') / asset_urls('sports.bundle.js')
+   - ASSET_PIPELINE=0 (or a failed build) falls back to the plain /static/ files
+6. Edits to static/ are picked up on the next restart or reload (refresh.sh)
+'''
+ASSET_PIPELINE = os.getenv("ASSET_PIPELINE", "1") == "1"
+ASSET_MINIFY = os.getenv("ASSET_MINIFY", "1") == "1"
+ASSET_DIR = os.path.join(app.static_folder, 'dist')
+
+#one script per module page: the shared ETag fetch helper + the module itself
+ASSET_BUNDLES = {
+    'calendar.bundle.js': ['conditional_fetch.js', 'calendar.js'],
+    'sports.bundle.js': ['conditional_fetch.js', 'sports.js'],
+    'stocks.bundle.js': ['conditional_fetch.js', 'stocks.js'],
+}
+
+def load_asset_manifest():
+    if not ASSET_PIPELINE:
+        return {}
+    try:
+        return build_assets(app.static_folder, ASSET_DIR, ASSET_BUNDLES, minify=ASSET_MINIFY)
+    except (OSError, ValueError) as e:
+        print(f"Error building static assets, serving plain static files: {e}")
+        return {}
+
+asset_manifest = load_asset_manifest()
+#files from the current build, plus the previous one (pages from a worker draining after a reload still link to it)
+asset_files = served_assets(ASSET_DIR) if asset_manifest else set()
+
+@app.template_global()
+def asset_url(name):
+    #hashed pipeline file, or the plain static file (?v=<hash>) without the pipeline
+    if name in asset_manifest:
+        return url_for('asset', filename=asset_manifest[name])
+    return url_for('static', filename=name)
+
+@app.template_global()
+def asset_urls(name):
+    #bundle: one URL for the bundle, or one per part without the pipeline
+    if name in asset_manifest or name not in ASSET_BUNDLES:
+        return [asset_url(name)]
+    return [asset_url(part) for part in ASSET_BUNDLES[name]]
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    if filename not in asset_files:
+        abort(404)
+    path, encoding = asset_variant(ASSET_DIR, filename, request.headers.get('Accept-Encoding'))
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream', conditional=True)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    #caches must keep the gzip / brotli / plain copies apart
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}, immutable"
+    return response
+
 #set current page to home module
 current_page = "home"
 
+'''
+Cached Data Sources
+1. Each data module (stocks, sports, calendar) wraps its upstream fetch function in a CachedSource
+2. A CachedSource keeps the last payload in memory along with the time it was fetched
+3. Every refresh is also saved to the persistent cache store (cache_store.py), keyed by source + request params
+4. On boot the last saved payload is loaded back, so a restart serves warm data without using API quota
+5. Routes read from the cache and only fetch upstream themselves if the cache is empty or expired
+   - simultaneous misses are coalesced into one upstream fetch (see SingleFlight)
+   - stale-while-revalidate: expired data is returned instantly while one background refresh runs
+   - failed refreshes never replace the last good payload, it is served until it is older than max_stale
+   - sources with an API quota (quota.py) refresh no faster than their budget allows and serve cached data once it runs out
+6. The prefetch scheduler (bottom of file) refreshes every source before its TTL runs out
+'''
+'''
+Request Coalescing (single-flight)
+1. When the cache is missed by several requests at once (ex. mirror iframe + phone on /remote), only the first one calls upstream
+2. The others wait for that in-flight call and share its result (or its error)
+3. Calls are grouped by key (source name + request params), different keys still run in parallel
+4. begin/finish let code that isn't a plain blocking thread (the async routes in asgi.py) lead or join the same calls
+'''
+class InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def outcome(self):
+        #result of a finished call, or its error raised again
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def begin(self, key):
+        #(call, leader): the leader runs the fetch and must call finish, everyone else waits on call.done
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                return call, False
+            call = InFlightCall()
+            self.calls[key] = call
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        call.result = result
+        call.error = error
+        with self.lock:
+            del self.calls[key]
+        call.done.set()
+
+    def do(self, key, fn):
+        call, leader = self.begin(key)
+
+        #someone else is already fetching this key, wait for their result
+        if not leader:
+            call.done.wait()
+            return call.outcome()
+
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+inflight = SingleFlight()
+
+#stale-while-revalidate: expired data younger than CACHE_MAX_STALE is served instantly while one background refresh runs
+STALE_WHILE_REVALIDATE = os.getenv("STALE_WHILE_REVALIDATE", "1") == "1"
+CACHE_MAX_STALE = int(os.getenv("CACHE_MAX_STALE", 86400))  # seconds
+
+#persistent cache: CACHE_BACKEND is "sqlite" (CACHE_PATH is a db file) or "json" (CACHE_PATH is a folder)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.getenv("CACHE_PATH", "cache/mirror_cache.db")
+cache_store = open_cache_store(CACHE_BACKEND, CACHE_PATH)
+
+#upstream call budgets (free tiers): Alpha Vantage 25 requests/day, Sportradar trial 1000 requests/month at ~1 per second
+alpha_vantage_quota = QuotaBudget('alphavantage', cache_store, per_day=int(os.getenv("ALPHA_VANTAGE_DAILY_LIMIT", 25)),
+                                  bucket=TokenBucket(rate=5 / 60, capacity=5))
+sportradar_quota = QuotaBudget('sportradar', cache_store, per_month=int(os.getenv("SPORTRADAR_MONTHLY_LIMIT", 1000)),
+                               bucket=TokenBucket(rate=1, capacity=1))
+
+#one keep-alive session for every upstream call (upstream_session.py), each module section mounts its host's pool + retry policy
+upstream_session = open_upstream_session()
+
+class CachedSource:
+    def __init__(self, name, fetch, ttl, interval=None, jitter=0, params=None, store=None, max_stale=None, fallback=None,
+                 quota=None, calls_per_refresh=1, quota_share=1.0, on_update=None):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        #default to refreshing a little before the cache expires
+        self.interval = interval if interval is not None else ttl * 0.9
+        self.jitter = jitter
+        #request params the data depends on, dict or function returning a dict (ex. today's date)
+        self.params = params
+        self.store = store
+        #oldest data we are still willing to serve while a refresh runs (or keeps failing)
+        self.max_stale = max_stale if max_stale is not None else CACHE_MAX_STALE
+        #payload returned if the very first fetch fails and there is nothing cached yet
+        self.fallback = fallback
+        #upstream call budget: refreshes are spaced out so this source's share of the budget lasts the day/month
+        self.quota = quota
+        self.calls_per_refresh = calls_per_refresh
+        self.quota_share = quota_share
+        #called with every freshly fetched payload (ex. to prepare the route response while still in the prefetch thread)
+        self.on_update = on_update
+        self.data = None
+        self.data_params = None
+        self.fetched_at = 0
+        self.lock = threading.Lock()
+        self.revalidating = False
+        self.load()
+
+    def current_params(self):
+        return self.params() if callable(self.params) else (self.params or {})
+
+    def load(self):
+        #restore data saved by a previous run (if any) for the current params
+        if self.store is None:
+            return
+        params = self.current_params()
+        try:
+            entry = self.store.get(self.name, params)
+        except Exception as e:
+            print(f"Error loading cached {self.name} data: {e}")
+            return
+        if entry is not None:
+            with self.lock:
+                self.data = entry.data
+                self.data_params = params
+                self.fetched_at = entry.fetched_at
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def planned_interval(self):
+        #time between refreshes the quota planner allows (0 if this source has no quota)
+        if self.quota is None:
+            return 0
+        return self.quota.planned_interval(self.calls_per_refresh, self.quota_share)
+
+    def effective_ttl(self):
+        #never treat data as expired sooner than the quota can afford to replace it
+        return max(self.ttl, self.planned_interval())
+
+    def refresh_interval(self):
+        return max(self.interval, self.planned_interval())
+
+    def is_fresh(self):
+        #checks if data exists, was fetched for the current params and is still valid
+        return self.data is not None and self.data_params == self.current_params() and self.age() < self.effective_ttl()
+
+    def refresh(self):
+        #concurrent refreshes for the same source + params share one upstream fetch
+        params = self.current_params()
+        return inflight.do(make_key(self.name, params), lambda: self.fetch_and_store(params))
+
+    def fetch_and_store(self, params):
+        #fetch from upstream and store data in cache with timestamp
+        return self.save(params, self.fetch())
+
+    def save(self, params, data):
+        #keep a freshly fetched payload (also used by the async routes in asgi.py)
+        fetched_at = time.time()
+        with self.lock:
+            #fetch handed back the payload already cached (nothing changed upstream): only the timestamp moves
+            unchanged = data is self.data and params == self.data_params
+            self.data = data
+            self.data_params = params
+            self.fetched_at = fetched_at
+        if unchanged:
+            return data
+        #save to disk so the next restart starts warm
+        if self.store is not None:
+            try:
+                self.store.set(self.name, params, data, self.ttl, fetched_at)
+            except Exception as e:
+                print(f"Error saving cached {self.name} data: {e}")
+        if self.on_update is not None:
+            try:
+                self.on_update(data)
+            except Exception as e:
+                print(f"Error preparing {self.name} response: {e}")
+        return data
+
+    def is_usable_stale(self):
+        #expired, but still within max_stale for the current params
+        return self.data is not None and self.data_params == self.current_params() and self.age() < self.max_stale
+
+    def revalidate(self):
+        #background refresh for stale-while-revalidate, failures keep the last good payload
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing {self.name} data, keeping cached copy: {e}")
+        finally:
+            with self.lock:
+                self.revalidating = False
+
+    def start_revalidate(self):
+        #only one background refresh per source at a time
+        with self.lock:
+            if self.revalidating:
+                return
+            self.revalidating = True
+        threading.Thread(target=self.revalidate, name=f"revalidate-{self.name}", daemon=True).start()
+
+    def get(self):
+        #serve from memory, only hit upstream if nothing valid is cached
+        if self.is_fresh():
+            return self.data
+        #params changed (ex. new day), another run may already have saved them
+        if self.data_params != self.current_params():
+            self.load()
+            if self.is_fresh():
+                return self.data
+        #expired but not too old: return it now and refresh in the background
+        if STALE_WHILE_REVALIDATE and self.is_usable_stale():
+            self.start_revalidate()
+            return self.data
+        try:
+            return self.refresh()
+        except Exception as e:
+            return self.recover(e)
+
+    def recover(self, e):
+        #a refresh failed with e: pick what to serve instead, or re-raise if there is nothing
+        if isinstance(e, QuotaExceeded):
+            #out of API budget: any cached copy beats an error, however old
+            if self.data is not None:
+                print(f"{e}, serving cached {self.name} data")
+                return self.data
+            if self.fallback is not None:
+                return self.fallback
+            raise e
+        #upstream down: keep serving the last good payload until it passes max_stale
+        if self.is_usable_stale():
+            print(f"Error refreshing {self.name} data, serving stale copy: {e}")
+            return self.data
+        if self.fallback is not None:
+            print(f"Error fetching {self.name} data: {e}")
+            return self.fallback
+        raise e
+
+    def time_until_refresh(self):
+        #how long the prefetch scheduler can wait before this source is due
+        if self.data is None or self.data_params != self.current_params():
+            return 0
+        return max(0, self.refresh_interval() - self.age())
+
+    def next_delay(self):
+        #random jitter so sources don't all refresh at the same moment
+        return max(1, self.refresh_interval() + random.uniform(-self.jitter, self.jitter))
+
 '''
 Mirror UI Routes
 '''
@@ -47,16 +528,42 @@ def mirror():
 
 @app.route('/current_page')
 def get_current_page():
-    #return the name of the current active page
+    #return the name of the current active page (polling fallback for /page_events)
     return jsonify({"page": current_page})
 
+#notified every time /set_page changes the current page
+page_changed = threading.Condition()
+#seconds between keep-alive comments on an idle /page_events stream
+PAGE_EVENTS_HEARTBEAT = 15
+
+@app.route('/page_events')
+def page_events():
+    #Server-Sent Events stream: pushes the current page once, then again every time it changes
+    def stream():
+        last_sent = None
+        while True:
+            with page_changed:
+                page_changed.wait_for(lambda: current_page != last_sent, timeout=PAGE_EVENTS_HEARTBEAT)
+                page = current_page
+            if page != last_sent:
+                last_sent = page
+                yield f"data: {json.dumps({'page': page})}\n\n"
+            else:
+                #keep the connection open (and notice closed mirrors) while nothing changes
+                yield ": keep-alive\n\n"
+
+    return Response(stream(), mimetype='text/event-stream', headers={'X-Accel-Buffering': 'no'})
+
 @app.route('/set_page', methods=['POST'])
 def set_current_page():
     #update the /mirror page based on user request (from /remote)
     global current_page
     data = request.get_json()
     page = data.get('page', 'home')
-    current_page = page
+    #wake up every connected /page_events stream
+    with page_changed:
+        current_page = page
+        page_changed.notify_all()
     return jsonify({"status": "success", "current_page": current_page})
 
 
@@ -93,8 +600,20 @@ def sports():
 LED Color Slider Route
 1. Listens for POST requests containing a JSON with color value in hex format
 2. Extracts color value from JSON data
-3. Writes color value to color.txt so it can be used by other scripts to update the strip
+3. Writes color value to color.txt so motionpower.py can restore it on boot
+4. Sends the color to motionpower.py over its Unix socket so the strip updates immediately
 '''
+COLOR_FILE = "/home/pi/smart-mirror/color.txt"
+LED_COLOR_SOCKET = "/tmp/smart-mirror-led.sock"
+
+def notify_led_color(color_hex):
+    #fire-and-forget datagram, if motionpower.py isn't running it picks the color up from color.txt on start
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(color_hex.encode(), LED_COLOR_SOCKET)
+    except OSError as e:
+        print(f"LED color not sent to motionpower.py: {e}")
+
 @app.route('/set_led_color', methods=['POST'])
 def set_led_color():
     #Parse JSON data from request
@@ -103,200 +622,409 @@ def set_led_color():
     color_hex = data.get('color', '#ffffff')
 
     #Save color hex code to color.txt
-    with open("/home/pi/smart-mirror/color.txt", 'w') as f:
+    with open(COLOR_FILE, 'w') as f:
         f.write(color_hex)
 
+    #Push color to the LED script
+    notify_led_color(color_hex)
+
     #If successful, return response with said color
     return jsonify({'status': 'success', 'color_set_to': color_hex})
 
 '''
 Stocks Module API Endpoint
 1. Listens for GET requests to retrieve stock data for already established symbols
-2. Checks if cached stock data is still valid (within STOCK_CACHE_TTL seconds) due to freee API limits (25 requests per day)
-3. If cache is valid, returns cached data immediately
-4. If cache is expired or missing, fetches fresh data from Alpha Vantage API (may go over request limit)
-5. Parses the last 5 days' closing prices and formats dates
+2. Serves cached stock data from memory (kept warm by the prefetch scheduler) due to free API limits (25 requests per day)
+3. If cache is expired or missing, fetches fresh data from Alpha Vantage API (may go over request limit)
+   - every symbol is fetched in parallel on a bounded thread pool (STOCK_FETCH_WORKERS)
+4. Closing prices are appended to a local per-symbol history (cache_store.TimeSeriesStore)
+   - after the first fetch only outputsize=compact is requested and only new trading days are written
+   - a symbol is only requested when its history is missing the latest completed US trading session
+     (weekdays after 16:00 ET + STOCK_CLOSE_DELAY), so weekends, nights and market hours cost no calls
+   - only completed sessions are stored, an intraday price is never saved as that day's close
+   - a session the API has no bar for (market holiday) is remembered and not asked for again
+5. Builds the chart from the local history: last 5 days by default, ?window=1m/3m/6m/1y without extra API calls
 6. Updates cache with the newly fetched data
 7. Returns formatted stock data as JSON
 '''
 #caching setup for stock data
-cached_stock_data = None
-cached_stock_time = 0
 STOCK_CACHE_TTL = 600  # seconds
-
-@app.route('/stocks_data')
-def stocks_data():
-    #initialize cache variables
-    global cached_stock_data, cached_stock_time
-
-    now = time.time()
-
-    #checks if data exists and still valid
-    if cached_stock_data and (now - cached_stock_time) < STOCK_CACHE_TTL:
-        return jsonify(cached_stock_data)
-
-    #if no valid cache, get fresh data
+STOCK_REFRESH_INTERVAL = int(os.getenv("STOCK_REFRESH_INTERVAL", 540))  # seconds
+STOCK_REFRESH_JITTER = int(os.getenv("STOCK_REFRESH_JITTER", 30))  # seconds
+
+#set stocks you want to use, pre defined labels 4 letters
+STOCK_SYMBOLS = ['GOOGL', 'NVDA', 'INTC', 'NXPI']
+STOCK_API_URL = os.getenv("STOCK_API_URL", "https://www.alphavantage.co/query")
+#max number of symbols fetched at the same time
+STOCK_FETCH_WORKERS = int(os.getenv("STOCK_FETCH_WORKERS", 8))
+
+#local daily close history, and the outputsize used the very first time a symbol is fetched
+#("compact" = last 100 trading days, set to "full" for 20 years of history if your API plan allows it)
+STOCK_HISTORY_PATH = os.getenv("STOCK_HISTORY_PATH", "cache/stock_history.db")
+STOCK_INITIAL_OUTPUTSIZE = os.getenv("STOCK_INITIAL_OUTPUTSIZE", "compact")
+stock_history = TimeSeriesStore(STOCK_HISTORY_PATH)
+
+#US market close, and how long after it the day's bar is treated as final
+STOCK_MARKET_TZ = pytz.timezone('America/New_York')
+STOCK_MARKET_CLOSE = dt_time(16, 0)
+STOCK_CLOSE_DELAY = int(os.getenv("STOCK_CLOSE_DELAY", 900))  # seconds
+
+#one kept-alive connection per concurrent symbol fetch
+#no retries: alpha_vantage_quota charges one call per fetch, a retried 5xx would spend budget it never counted
+mount_host(upstream_session, STOCK_API_URL, HostPolicy(pool_size=STOCK_FETCH_WORKERS, retries=0))
+
+#chart windows: number of trading days, or calendar days back from today
+STOCK_WINDOWS = {
+    '5d': {'trading_days': 5},
+    '1m': {'days': 31},
+    '3m': {'days': 92},
+    '6m': {'days': 183},
+    '1y': {'days': 366},
+}
+
+def stock_chart(symbol, window='5d'):
+    #read the window from local history and format it for Chart.js
+    span = STOCK_WINDOWS[window]
+    if 'trading_days' in span:
+        points = stock_history.series(symbol, limit=span['trading_days'])
+    else:
+        points = stock_history.series(symbol, since=(date.today() - timedelta(days=span['days'])).isoformat())
+
+    labels, prices = [], []
+    for date_, close_price in points:
+        #format date as m/d - time doesnt matter
+        month, day = date_.split("-")[1:]
+        labels.append(f"{int(month)}/{int(day)}")
+        prices.append(close_price)
+
+    #formatted data for current stock (symbol)
+    return {"labels": labels, "prices": prices}
+
+def stock_url(symbol, last_day):
     API_KEY = "INSERT API KEY"
-    #set stocks you want to use, pre defined labels 4 letters
-    STOCK_SYMBOLS = ['GOOGL', 'NVDA', 'INTC', 'NXPI']
-    result = {}
+    #build API request URL (compact is enough once history exists)
+    outputsize = "compact" if last_day else STOCK_INITIAL_OUTPUTSIZE
+    return f"{STOCK_API_URL}?function=TIME_SERIES_DAILY&symbol={symbol}&outputsize={outputsize}&apikey={API_KEY}"
 
-    for symbol in STOCK_SYMBOLS:
-        #build API request URL
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&apikey={API_KEY}"
-        print(f"Fetching {symbol}: {url}")
-
-        #sencd HTTP request to Alpha Vantage
-        r = requests.get(url, timeout=10)
-        data = r.json()
-
-        #extract "Time Series (Daily) section since we only care about daily prices"
-        time_series = data.get("Time Series (Daily)", {})
-        
-        #set range to most recent 5 days of trading data
-        dates = sorted(time_series.keys(), reverse=True)[:5]
-
-        labels, prices = [], []
-
-        #sort in ascending order for correct chart order
-        for date_ in sorted(dates):
-            #extract the closing price
-            close_price = float(time_series[date_]["4. close"])
-
-            #format date as m/d - time doesnt matter
-            month, day = date_.split("-")[1:]
-            labels.append(f"{int(month)}/{int(day)}")
-            prices.append(close_price)
-
-        #store formatted data for current stock (symbol)
-        result[symbol] = {"labels": labels, "prices": prices}
-
-    #store data in cache with timestamp
-    cached_stock_data = result
-    cached_stock_time = now
+def reserve_stock_call(symbol, last_day):
+    #out of Alpha Vantage budget (or rate limited): returns False so the caller charts whatever history we already have
+    try:
+        alpha_vantage_quota.acquire()
+        return True
+    except QuotaExceeded as e:
+        if last_day is None:
+            raise
+        print(f"{e}, serving stored {symbol} history")
+        return False
+
+def last_completed_session(now=None):
+    #"YYYY-MM-DD" of the most recent weekday whose session has closed (holidays are found out by stock_session_due)
+    now = now or datetime.now(STOCK_MARKET_TZ)
+    settled = (datetime.combine(now.date(), STOCK_MARKET_CLOSE) + timedelta(seconds=STOCK_CLOSE_DELAY)).time()
+    day = now.date()
+    if day.weekday() >= 5 or now.time() < settled:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+def stock_session_due(symbol, last_day, session):
+    #True if session is missing from the history and the API hasn't already said it has no bar for it
+    if last_day is not None and last_day >= session:
+        return False
+    missing = cache_store.get('stock_missing_session', {'symbol': symbol})
+    return missing is None or missing.data != session
+
+def store_stock_series(symbol, last_day, data, session):
+    #extract "Time Series (Daily) section since we only care about daily prices"
+    time_series = data.get("Time Series (Daily)", {})
+
+    #append new completed trading days (last stored day is re-written in case its close was updated)
+    #bars after session are still trading, their price isn't a close yet
+    stock_history.append(symbol, [
+        (date_, float(values["4. close"]))
+        for date_, values in time_series.items()
+        if (last_day is None or date_ >= last_day) and date_ <= session
+    ])
+    #a real answer without the session's bar: the market was closed that day, don't ask again for it
+    if time_series and session not in time_series:
+        cache_store.set('stock_missing_session', {'symbol': symbol}, session, 7 * 86400)
+
+def fetch_stock_symbol(symbol):
+    last_day = stock_history.last_day(symbol)
+    session = last_completed_session()
+    #latest close is already stored (or the market was closed), nothing new to download
+    if not stock_session_due(symbol, last_day, session):
+        return stock_chart(symbol)
+
+    url = stock_url(symbol, last_day)
+    print(f"Fetching {symbol}: {url}")
+    if not reserve_stock_call(symbol, last_day):
+        return stock_chart(symbol)
+
+    #sencd HTTP request to Alpha Vantage
+    r = upstream_session.get(url, timeout=10)
+    store_stock_series(symbol, last_day, r.json(), session)
+
+    #most recent 5 days of trading data
+    return stock_chart(symbol)
+
+def fetch_stocks(symbols=None, workers=None):
+    #get fresh data from Alpha Vantage, all symbols in parallel
+    symbols = symbols or STOCK_SYMBOLS
+    workers = workers or STOCK_FETCH_WORKERS
+
+    #bounded thread pool so a long symbol list doesn't open hundreds of connections at once
+    with ThreadPoolExecutor(max_workers=min(workers, len(symbols))) as pool:
+        results = pool.map(fetch_stock_symbol, symbols)
+        #merge back in the original symbol order
+        return dict(zip(symbols, results))
+
+stock_cache = CachedSource('stocks', fetch_stocks, STOCK_CACHE_TTL, STOCK_REFRESH_INTERVAL, STOCK_REFRESH_JITTER,
+                           params={'symbols': STOCK_SYMBOLS}, store=cache_store,
+                           quota=alpha_vantage_quota, calls_per_refresh=len(STOCK_SYMBOLS),
+                           on_update=lambda data: prepare_payload('stocks', (data,), lambda: data))
 
-    #return new stock data
-    return jsonify(result)
+@app.route('/stocks_data')
+def stocks_data():
+    #return cached stock data (fetches only if cache is cold or expired)
+    data = stock_cache.get()
+    window = request.args.get('window', '5d')
+    if window == '5d' or window not in STOCK_WINDOWS:
+        #default window is the cached payload itself, served prebuilt
+        return prepared_payload('stocks', (data,), lambda: data).response()
+    return data_response(stock_window(data, window))
+
+def stock_window(data, window):
+    if window == '5d' or window not in STOCK_WINDOWS:
+        return data
+    #longer windows come straight from the local history (kept up to date by the cache refresh)
+    return {symbol: stock_chart(symbol, window) for symbol in data}
 
 '''
 Sports API ROute
 1. Listens for GET requests to provide 2 variables: today's MLB games and division standings
-2. Checks if cached sports data is still valid (within SPORTS_CACHE_TTL seconds) (1000 requests per month)
-3. If cache is valid, returns cached data immediately
-4. If cache is expired or missing, fetches new data from Sportradar API
+2. Serves cached sports data from memory (kept warm by the prefetch scheduler) (1000 requests per month)
+3. Schedule and standings are cached separately: standings only change a few times a day so they get a longer TTL
+4. If cache is expired or missing, asks Sportradar if the data changed (ETag / Last-Modified)
+   - 304 Not Modified reuses the stored parsed payload, no download and no re-parse
 5. Parses today's games and formats game times in EST
 6. Parses division standings including wins, losses, win %, GB(games behind), and last 10 games record
 7. Updates cache with the newly fetched sports data
 8. Returns formatted sports data as JSON
 '''
-#caching setup for sports data
-cached_sports_data = None
-cached_sports_time = 0
+#caching setup for sports data (SPORTS_CACHE_TTL is today's schedule)
 SPORTS_CACHE_TTL = 600  # seconds
+SPORTS_REFRESH_INTERVAL = int(os.getenv("SPORTS_REFRESH_INTERVAL", 540))  # seconds
+SPORTS_REFRESH_JITTER = int(os.getenv("SPORTS_REFRESH_JITTER", 30))  # seconds
+STANDINGS_CACHE_TTL = 10800  # seconds
+STANDINGS_REFRESH_INTERVAL = int(os.getenv("STANDINGS_REFRESH_INTERVAL", 9900))  # seconds
+STANDINGS_REFRESH_JITTER = int(os.getenv("STANDINGS_REFRESH_JITTER", 300))  # seconds
+SPORTS_API_URL = os.getenv("SPORTS_API_URL", "https://api.sportradar.com/mlb/trial/v8/en")
+#schedule + standings can refresh at the same time, 429 is left to the rate limiter in quota.py
+#no retries: sportradar_quota charges one call per fetch, a failed call waits for the next refresh instead
+mount_host(upstream_session, SPORTS_API_URL, HostPolicy(pool_size=2, retries=0))
+
+def conditional_headers(name, path):
+    #If-None-Match / If-Modified-Since from the last response for this path (stored per path, no API key in the key)
+    stored = cache_store.get('http', {'source': name, 'path': path})
+    headers = {}
+    if stored is not None:
+        if stored.data.get('etag'):
+            headers['If-None-Match'] = stored.data['etag']
+        if stored.data.get('last_modified'):
+            headers['If-Modified-Since'] = stored.data['last_modified']
+    return stored, headers
+
+def conditional_payload(name, path, parse, ttl, stored, response):
+    #304 returns the stored parsed payload, anything else is parsed and its validators saved
+    if response.status_code == 304 and stored is not None:
+        return stored.data['payload']
+    response.raise_for_status()
+
+    payload = parse(response.json())
+    validators = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+    #only worth storing if the server gave us something to revalidate with
+    if validators['etag'] or validators['last_modified']:
+        cache_store.set('http', {'source': name, 'path': path}, dict(validators, payload=payload), ttl)
+    return payload
+
+def sports_url(path):
+    API_KEY = "INSERT API KEY"
+    return f"{SPORTS_API_URL}{path}?api_key={API_KEY}"
 
-@app.route('/sports_data')
-def sports_data():
-    #initialize cache variables
-    global cached_sports_data, cached_sports_time
-
-    now = time.time()
-
-    #checks if data exists and still valid
-    if cached_sports_data and (now - cached_sports_time) < SPORTS_CACHE_TTL:
-        # Return cached sports if not expired
-        print("✅ Returning cached sports data")
-        return jsonify(cached_sports_data)
+def fetch_conditional(name, path, parse, ttl):
+    #conditional GET, errors are raised instead of caught here so a failed refresh never replaces good cached data with empty lists
+    stored, headers = conditional_headers(name, path)
+    sportradar_quota.acquire()
+    response = upstream_session.get(sports_url(path), headers=headers, timeout=10)
+    return conditional_payload(name, path, parse, ttl, stored, response)
 
-    #if no valid cache, get fresh data
-    API_KEY = "INSERT API KEY"
+def parse_games(data):
     tz = pytz.timezone("US/Eastern")
+    games = []
+    for game in data.get('games', []):
+        #format team names and convert game time to EST
+        away = f"{game['away'].get('market', '')} {game['away']['name']}".strip()
+        home = f"{game['home'].get('market', '')} {game['home']['name']}".strip()
+        game_time_utc = datetime.fromisoformat(game['scheduled'])
+        game_time_local = game_time_utc.astimezone(tz).strftime("%I:%M %p")
+        games.append({'away': away, 'home': home, 'time': game_time_local})
+    return games
+
+def parse_standings(data):
+    divisions = []
+    for league in data['league']['season']['leagues']:
+        for division in league['divisions']:
+            teams = []
+            for team in division['teams']:
+                #extract team standings information
+                teams.append({
+                    'rank': team['rank']['division'],
+                    'name': team['name'],
+                    'wins': team['win'],
+                    'losses': team['loss'],
+                    'win_p': f"{team['win_p']:.3f}",
+                    'games_back': team['games_back'],
+                    'last_10': f"{team['last_10_won']}-{team['last_10_lost']}"
+                })
+            divisions.append({'division_name': division['name'], 'teams': teams})
+    return divisions
+
+def games_path():
     today = date.today()
+    return f"/games/{today.year}/{today.month:02}/{today.day:02}/schedule.json"
 
-    #build API request URL
-    games_url = f"https://api.sportradar.com/mlb/trial/v8/en/games/{today.year}/{today.month:02}/{today.day:02}/schedule.json?api_key={API_KEY}"
-    standings_url = f"https://api.sportradar.com/mlb/trial/v8/en/seasons/{today.year}/REG/standings.json?api_key={API_KEY}"
+def standings_path():
+    return f"/seasons/{date.today().year}/REG/standings.json"
 
-    games, divisions = [], []
+def fetch_games():
+    #get today's games
+    return fetch_conditional('games', games_path(), parse_games, SPORTS_CACHE_TTL)
 
-    try:
-        #get today's games
-        games_response = requests.get(games_url)
-        if games_response.status_code == 200:
-            data = games_response.json()
-            for game in data.get('games', []):
-                #format team names and convert game time to EST
-                away = f"{game['away'].get('market', '')} {game['away']['name']}".strip()
-                home = f"{game['home'].get('market', '')} {game['home']['name']}".strip()
-                game_time_utc = datetime.fromisoformat(game['scheduled'])
-                game_time_local = game_time_utc.astimezone(tz).strftime("%I:%M %p")
-                games.append({'away': away, 'home': home, 'time': game_time_local})
-
-        #get standings data
-        standings_response = requests.get(standings_url)
-        if standings_response.status_code == 200:
-            data = standings_response.json()
-            for league in data['league']['season']['leagues']:
-                for division in league['divisions']:
-                    teams = []
-                    for team in division['teams']:
-                        #extract team standings information
-                        teams.append({
-                            'rank': team['rank']['division'],
-                            'name': team['name'],
-                            'wins': team['win'],
-                            'losses': team['loss'],
-                            'win_p': f"{team['win_p']:.3f}",
-                            'games_back': team['games_back'],
-                            'last_10': f"{team['last_10_won']}-{team['last_10_lost']}"
-                        })
-                    divisions.append({'division_name': division['name'], 'teams': teams})
-
-    #error handling; catch any errors during fetching/parsing data
-    except Exception as e:
-        print(f"Error fetching sports data: {e}")
-
-    #store data in cache with timestamp 
-    cached_sports_data = {'games': games, 'divisions': divisions}
-    cached_sports_time = now
-
-    #return new sports data
-    return jsonify(cached_sports_data)
+def fetch_standings():
+    #get standings data
+    return fetch_conditional('standings', standings_path(), parse_standings, STANDINGS_CACHE_TTL)
+
+#schedule is per day, so today's date is part of the cache key
+games_cache = CachedSource('games', fetch_games, SPORTS_CACHE_TTL, SPORTS_REFRESH_INTERVAL, SPORTS_REFRESH_JITTER,
+                           params=lambda: {'date': date.today().isoformat()}, store=cache_store, fallback=[],
+                           quota=sportradar_quota, quota_share=0.8, on_update=lambda data: prepare_sports())
+#standings change a few times a day, so they only get a small share of the Sportradar budget
+standings_cache = CachedSource('standings', fetch_standings, STANDINGS_CACHE_TTL, STANDINGS_REFRESH_INTERVAL, STANDINGS_REFRESH_JITTER,
+                               params=lambda: {'season': date.today().year}, store=cache_store, fallback=[],
+                               quota=sportradar_quota, quota_share=0.2, on_update=lambda data: prepare_sports())
+
+def sports_payload(games, divisions):
+    return {'games': games, 'divisions': divisions}
+
+def prepare_sports():
+    #rebuild /sports_data after either half refreshes (once both halves exist)
+    games, divisions = games_cache.data, standings_cache.data
+    if games is not None and divisions is not None:
+        prepare_payload('sports', (games, divisions), lambda: sports_payload(games, divisions))
+
+@app.route('/sports_data')
+def sports_data():
+    #return cached sports data (each part fetches only if its cache is cold or expired)
+    games, divisions = games_cache.get(), standings_cache.get()
+    return prepared_payload('sports', (games, divisions), lambda: sports_payload(games, divisions)).response()
 
 '''
 Spotify Module API Routes
 1. spotify_data: Fetches the currently playing Spotify track using a saved token (spotify_token.json)
 2. callback: Handles Spotify OAuth callback and saves the access token for future use
+3. One SpotifyOAuth + Spotify client is shared by every request (built on first use)
+4. The token is read from disk once and kept in memory, it is only written back when it changes
+5. The token is refreshed SPOTIFY_REFRESH_AHEAD seconds before it expires so no poll ever waits on a refresh
+6. All Spotify calls go through the shared upstream session (keep-alive, retries on 429/5xx with Retry-After)
 '''
+SPOTIFY_TOKEN_PATH = 'secrets/.spotify_token.json'
+SPOTIFY_REFRESH_AHEAD = 300  # seconds
+SPOTIFY_API_URL = os.getenv("SPOTIFY_API_URL")
+#same retry rules spotipy uses on its own session, plus the token endpoint (refresh POSTs are safe to repeat)
+mount_host(upstream_session, SPOTIFY_API_URL or "https://api.spotify.com/v1/",
+           HostPolicy(backoff=0.3, retry_statuses=(429, 500, 502, 503, 504)))
+mount_host(upstream_session, "https://accounts.spotify.com/api/token", HostPolicy(pool_size=1, methods=('POST',)))
+
+class SpotifyTokenCache(CacheFileHandler):
+    #same file format as before, but only touches the disk on first read and on save
+    def __init__(self, cache_path):
+        super().__init__(cache_path=cache_path)
+        self.token_info = None
+        self.loaded = False
+
+    def get_cached_token(self):
+        if not self.loaded:
+            self.token_info = super().get_cached_token()
+            self.loaded = True
+        return self.token_info
+
+    def save_token_to_cache(self, token_info):
+        self.token_info = token_info
+        self.loaded = True
+        super().save_token_to_cache(token_info)
+
+class SpotifyConnection:
+    def __init__(self):
+        #pooled HTTP session shared by the OAuth manager and the API client
+        self.session = upstream_session
+        self.token_cache = SpotifyTokenCache(SPOTIFY_TOKEN_PATH)
+        self.oauth = SpotifyOAuth(
+            client_id=os.getenv("CLIENT_ID"),
+            client_secret=os.getenv("CLIENT_SECRET"),
+            redirect_uri='http://10.0.0.180:5000/callback',
+            scope='user-read-playback-state user-read-currently-playing',
+            cache_handler=self.token_cache,
+            requests_session=self.session
+        )
+        self.client = Spotify(auth_manager=self.oauth, requests_session=self.session)
+        #override only for testing against a local fake Spotify API
+        if SPOTIFY_API_URL:
+            self.client.prefix = SPOTIFY_API_URL
+
+    def token(self):
+        #in-memory token, refreshed ahead of expiry (concurrent requests share one refresh)
+        token_info = self.token_cache.get_cached_token()
+        if not token_info:
+            return None
+        if token_info['expires_at'] - time.time() < SPOTIFY_REFRESH_AHEAD:
+            token_info = inflight.do('spotify-token', lambda: self.oauth.refresh_access_token(token_info['refresh_token']))
+        return token_info
+
+spotify_connection = None
+spotify_lock = threading.Lock()
+
+def get_spotify():
+    #create the shared Spotify connection on first use
+    global spotify_connection
+    with spotify_lock:
+        if spotify_connection is None:
+            spotify_connection = SpotifyConnection()
+        return spotify_connection
+
 @app.route('/spotify_data')
 def get_spotify_info():
-    #authenticate credentials and get current playback info from Spotify
-    sp_oauth = SpotifyOAuth(
-        client_id=os.getenv("CLIENT_ID"),
-        client_secret=os.getenv("CLIENT_SECRET"),
-        redirect_uri='http://10.0.0.180:5000/callback',
-        scope='user-read-playback-state user-read-currently-playing',
-        cache_path='secrets/.spotify_token.json'
-    )
+    spotify = get_spotify()
 
     #check for cached token (spotify_token.json)
-    token_info = sp_oauth.get_cached_token()
+    token_info = spotify.token()
     if not token_info:
         #if no valid token, redirect to spotify login
-        return redirect(sp_oauth.get_authorize_url())
+        return redirect(spotify.oauth.get_authorize_url())
 
-    #create spotify client using valid token
-    sp = Spotify(auth_manager=sp_oauth)
-
-    #fetch current track playing
-    song = sp.current_playback()
+    #fetch current track playing (requests arriving at the same time share one Spotify call)
+    song = inflight.do('spotify', spotify.client.current_playback)
+    return data_response(format_playback(song))
 
+def format_playback(song):
     if song and song.get('item'):
         track = song['item']
         album = track.get('album', {})
         artists = track.get('artists', [])
 
-        #return track info as json
-        return jsonify({
+        #track info for the spotify module
+        return {
             'name': track.get('name'),
             'artist': artists[0]['name'] if artists else 'N/A',
             'album': album.get('name'),
@@ -304,27 +1032,21 @@ def get_spotify_info():
             'device': song.get('device', {}).get('name'),
             'duration_ms': track.get('duration_ms', 0),
             'progress_ms': song.get('progress_ms', 0)
-        })
+        }
 
     #if no song is detected playing, just return null/empty for all
-    return jsonify({'name': 'N/A', 'artist': 'N/A', 'album': 'N/A', 'album_cover': '', 'device': 'N/A'})
+    return {'name': 'N/A', 'artist': 'N/A', 'album': 'N/A', 'album_cover': '', 'device': 'N/A'}
 
 @app.route('/callback')
 def spotify_callback():
     #handle OAuth callback from Spotify after user login
-    sp_oauth = SpotifyOAuth(
-        client_id=os.getenv("CLIENT_ID"),
-        client_secret=os.getenv("CLIENT_SECRET"),
-        redirect_uri='http://10.0.0.180:5000/callback',
-        scope='user-read-playback-state user-read-currently-playing',
-        cache_path='secrets/.spotify_token.json'
-    )
+    spotify = get_spotify()
 
     #extract auth code from query parameters
     code = request.args.get('code')
 
-    #exchange auth code for token
-    token_info = sp_oauth.get_access_token(code, as_dict=True)
+    #exchange auth code for token (saved to memory and spotify_token.json)
+    token_info = spotify.oauth.get_access_token(code, as_dict=True)
 
     #redirect to /spotify if successful
     return redirect('/spotify') if token_info else "Authorization failed"
@@ -332,37 +1054,236 @@ def spotify_callback():
 '''
 Google Calendar API Route
 1. Listens for GET requests to fetch calendar events from google cal
-2. Checks for existing token to authenticate with Google Calendar API
-3. If token is expired, refreshes it; if missing, requires full OAuth login
-4. Connects to cal API using valid credentials
-5. Fetches today's events from "Classes" calendar
-6. Fetches upcoming personal events from "Other" calendar
+2. Checks for existing token to authenticate with Google Calendar API (read once, then kept in memory)
+3. If token is expired or about to expire, refreshes it; if missing, requires full OAuth login
+4. Connects to cal API using valid credentials (service is built once and reused)
+5. Fetches today's events from "Classes" calendar and upcoming personal events from "Other" calendar (see CALENDARS)
+6. All calendars are listed in one batch request, so latency tracks the slowest calendar instead of the sum
+   - incremental mode: events are kept in a local store (cache_store.py) and each poll only downloads changes since the last syncToken
+   - the store is kept in memory and only written to disk when a sync brings changes (or a new token)
+   - a poll with no changes returns the last payload as is, nothing is re-parsed, saved or re-prepared
 7. Parses event times and formats them for easy display
-8. Returns today's and upcoming events as JSON
+8. Caches the result in memory; the prefetch scheduler keeps it warm
+9. Returns today's and upcoming events as JSON
 '''
-@app.route('/calendar_data')
-def get_calendar_events():
-    #authenticate and get calendar events
-    SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
-
-    creds = None
-
-    #check if saved token file exists and is valid
-    if os.path.exists('secrets/token.json'):
-        creds = Credentials.from_authorized_user_file('secrets/token.json', SCOPES)
-        #refresh token if expired
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-
-    #if no valid token, start full OAauth authorization process
-    if not creds or not creds.valid:
-        flow = InstalledAppFlow.from_client_secrets_file('secrets/credentials.json', SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open('secrets/token.json', 'w') as token:
-            token.write(creds.to_json())
-
-    #build Google Calendar API service
-    service = build('calendar', 'v3', credentials=creds)
+#sync mode: "incremental" only downloads changed events (syncToken), "full" re-lists the whole 90 day window
+CALENDAR_SYNC_MODE = os.getenv("CALENDAR_SYNC_MODE", "incremental")
+
+#caching setup for calendar data (incremental polls are cheap enough to run every minute)
+CALENDAR_CACHE_TTL = 60 if CALENDAR_SYNC_MODE == "incremental" else 300  # seconds
+CALENDAR_REFRESH_INTERVAL = int(os.getenv("CALENDAR_REFRESH_INTERVAL", CALENDAR_CACHE_TTL * 0.9))  # seconds
+CALENDAR_REFRESH_JITTER = int(os.getenv("CALENDAR_REFRESH_JITTER", CALENDAR_CACHE_TTL * 0.05))  # seconds
+
+CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
+CALENDAR_TOKEN_PATH = 'secrets/token.json'
+#refresh Google credentials this many seconds before they expire
+CALENDAR_CREDS_REFRESH_AHEAD = 300  # seconds
+#token refreshes use the shared upstream session (the calendar API itself goes through googleapiclient's own httplib2 connection)
+mount_host(upstream_session, "https://oauth2.googleapis.com/token", HostPolicy(pool_size=1, methods=('POST',)))
+#override only for testing against a local fake discovery server
+CALENDAR_DISCOVERY_URL = os.getenv("CALENDAR_DISCOVERY_URL")
+
+class CalendarService:
+    #keeps credentials in memory and reuses one built Google Calendar API service
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.creds = None
+        self.service = None
+
+    def load_credentials(self):
+        creds = None
+
+        #check if saved token file exists and is valid
+        if os.path.exists(CALENDAR_TOKEN_PATH):
+            creds = Credentials.from_authorized_user_file(CALENDAR_TOKEN_PATH, CALENDAR_SCOPES)
+            #refresh token if expired
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request(session=upstream_session))
+
+        #if no valid token, start full OAauth authorization process
+        if not creds or not creds.valid:
+            flow = InstalledAppFlow.from_client_secrets_file('secrets/credentials.json', CALENDAR_SCOPES)
+            creds = flow.run_local_server(port=0)
+            with open(CALENDAR_TOKEN_PATH, 'w') as token:
+                token.write(creds.to_json())
+
+        return creds
+
+    def expires_soon(self):
+        #google-auth keeps expiry as a naive UTC datetime
+        if self.creds.expiry is None:
+            return False
+        now_utc = datetime.now(pytz.utc).replace(tzinfo=None)
+        return self.creds.expiry - now_utc < timedelta(seconds=CALENDAR_CREDS_REFRESH_AHEAD)
+
+    def refresh_credentials(self):
+        #refreshes in place, the built service keeps using the same creds object
+        self.creds.refresh(Request(session=upstream_session))
+        with open(CALENDAR_TOKEN_PATH, 'w') as token:
+            token.write(self.creds.to_json())
+
+    def get(self):
+        with self.lock:
+            if self.creds is None:
+                self.creds = self.load_credentials()
+            elif self.creds.refresh_token and self.expires_soon():
+                self.refresh_credentials()
+
+            #build Google Calendar API service once (discovery doc is only fetched here)
+            if self.service is None:
+                options = {'discoveryServiceUrl': CALENDAR_DISCOVERY_URL} if CALENDAR_DISCOVERY_URL else {}
+                self.service = build('calendar', 'v3', credentials=self.creds, cache_discovery=False, **options)
+            return self.service
+
+calendar_service = CalendarService()
+
+#calendars shown on the mirror
+#window "today": today's events only, "upcoming": tomorrow through the next 90 days
+CALENDARS = [
+    {'name': 'Classes', 'id': 'f68d2ac45e9ac7aba185ad08cc6d511542196634c495bca2cff141cf13e8e22f@group.calendar.google.com', 'window': 'today'},
+    {'name': 'Other', 'id': '9cf36c61af86479abe999f348c513dcdc1a190a54b22038fbba2f274401c8261@group.calendar.google.com', 'window': 'upcoming'},
+]
+#Google allows at most 50 calls in one batch request
+CALENDAR_BATCH_LIMIT = 50
+#incremental mode syncs this many days ahead, a full resync happens once the 90 day window gets close to the end
+CALENDAR_SYNC_HORIZON = 180  # days
+
+def run_calendar_batch(service, requests_by_id):
+    #send every request in as few batch round trips as possible, returns ({id: response}, {id: error})
+    results, errors = {}, {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            errors[request_id] = exception
+        else:
+            results[request_id] = response
+
+    ids = list(requests_by_id)
+    for chunk_start in range(0, len(ids), CALENDAR_BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=collect)
+        for request_id in ids[chunk_start:chunk_start + CALENDAR_BATCH_LIMIT]:
+            batch.add(requests_by_id[request_id], request_id=request_id)
+        batch.execute()
+
+    return results, errors
+
+def event_start(e, tz):
+    #parse event start time (timed or all-day event)
+    return datetime.fromisoformat(e['start'].get('dateTime', e['start'].get('date')).replace('Z', '')).astimezone(tz)
+
+def list_calendars_full(service, windows):
+    #full mode: list each calendar's window from scratch, returns raw events per calendar index
+    requests_by_id = {}
+    for index, calendar in enumerate(CALENDARS):
+        time_min, time_max = windows[calendar['window']]
+        requests_by_id[str(index)] = service.events().list(
+            calendarId=calendar['id'],
+            timeMin=time_min.isoformat(),
+            timeMax=time_max.isoformat(),
+            timeZone='America/New_York',
+            singleEvents=True,
+            orderBy='startTime'
+        )
+
+    results, errors = run_calendar_batch(service, requests_by_id)
+
+    #fail the whole refresh so the cache keeps the last good events
+    if errors:
+        raise next(iter(errors.values()))
+
+    return {int(request_id): result.get('items', []) for request_id, result in results.items()}
+
+#calendar id -> sync state (event store + sync token), read from disk once per process
+calendar_sync_states = {}
+
+def list_calendars_incremental(service, windows, today_start):
+    #incremental mode: apply only changed events to the local event store
+    #returns (stored events per calendar index, whether anything changed since the last call)
+    horizon_needed = max(time_max for _, time_max in windows.values())
+    states = {}
+    #calendar indexes whose events may differ from what the last payload was built from
+    changed = set()
+    for index, calendar in enumerate(CALENDARS):
+        if calendar['id'] in calendar_sync_states:
+            state = calendar_sync_states[calendar['id']]
+        else:
+            #first sync in this process: the last payload may predate the stored state
+            entry = cache_store.get('calendar_sync', {'calendar': calendar['id']})
+            state = entry.data if entry is not None else None
+            changed.add(index)
+        #no sync yet, or the synced range no longer covers the 90 day window: start over
+        if state is None or datetime.fromisoformat(state['synced_until']) < horizon_needed:
+            state = None
+        states[index] = state
+
+    #index -> page token of the next page to download (None = first page)
+    pending = {index: None for index in states}
+    while pending:
+        requests_by_id = {}
+        for index, page_token in pending.items():
+            state = states[index]
+            options = {'pageToken': page_token} if page_token else {}
+            if state is not None and state.get('sync_token'):
+                #only events changed since the last sync (Google doesn't allow timeMin/timeMax/orderBy with syncToken)
+                options['syncToken'] = state['sync_token']
+            else:
+                #full sync of the horizon, the last page hands out the first syncToken
+                if page_token is None:
+                    states[index] = state = {
+                        'events': {},
+                        'synced_until': (today_start + timedelta(days=CALENDAR_SYNC_HORIZON)).isoformat()
+                    }
+                    changed.add(index)
+                options['timeMin'] = today_start.isoformat()
+                options['timeMax'] = state['synced_until']
+            requests_by_id[str(index)] = service.events().list(
+                calendarId=CALENDARS[index]['id'],
+                timeZone='America/New_York',
+                singleEvents=True,
+                showDeleted=True,
+                **options
+            )
+
+        results, errors = run_calendar_batch(service, requests_by_id)
+        pending = {}
+
+        for request_id, error in errors.items():
+            index = int(request_id)
+            #410 Gone: sync token expired, throw the store away and do a full sync
+            if getattr(getattr(error, 'resp', None), 'status', None) == 410 and states[index] is not None and states[index].get('sync_token'):
+                states[index] = None
+                pending[index] = None
+            else:
+                raise error
+
+        for request_id, result in results.items():
+            index = int(request_id)
+            state = states[index]
+            items = result.get('items', [])
+            if items:
+                changed.add(index)
+            for e in items:
+                if e.get('status') == 'cancelled':
+                    state['events'].pop(e['id'], None)
+                else:
+                    #only keep what the mirror shows
+                    state['events'][e['id']] = {'start': e['start'], 'summary': e.get('summary', 'No Title')}
+            if result.get('nextPageToken'):
+                pending[index] = result['nextPageToken']
+                continue
+            calendar_id = CALENDARS[index]['id']
+            sync_token = result.get('nextSyncToken')
+            #unchanged events and token: the copy on disk is still exact, skip the write
+            if index in changed or sync_token != state.get('sync_token') or calendar_sync_states.get(calendar_id) is not state:
+                state['sync_token'] = sync_token
+                cache_store.set('calendar_sync', {'calendar': calendar_id}, state, CALENDAR_SYNC_HORIZON * 86400)
+            calendar_sync_states[calendar_id] = state
+
+    return {index: list(state['events'].values()) for index, state in states.items()}, bool(changed)
+
+def fetch_calendar():
+    #get the shared Google Calendar API service (credentials refreshed ahead of expiry)
+    service = calendar_service.get()
 
     #set timezone as EST and set date ranges
     tz = pytz.timezone('America/New_York')
@@ -371,45 +1292,150 @@ def get_calendar_events():
     three_months_later = (today + timedelta(days=90))
 
     #start and end vars for today and future events
-    start_today = tz.localize(datetime.combine(today, dt_time.min)).isoformat()
-    end_today = tz.localize(datetime.combine(today, dt_time.max)).isoformat()
-    start_future = tz.localize(datetime.combine(today + timedelta(days=1), dt_time.min)).isoformat()
-    end_future = tz.localize(datetime.combine(three_months_later, dt_time.max)).isoformat()
+    start_today = tz.localize(datetime.combine(today, dt_time.min))
+    end_today = tz.localize(datetime.combine(today, dt_time.max))
+    start_future = tz.localize(datetime.combine(today + timedelta(days=1), dt_time.min))
+    end_future = tz.localize(datetime.combine(three_months_later, dt_time.max))
+    windows = {'today': (start_today, end_today), 'upcoming': (start_future, end_future)}
+
+    if CALENDAR_SYNC_MODE == "incremental":
+        events_by_calendar, changed = list_calendars_incremental(service, windows, start_today)
+        #no changes and still the same day: the payload built last time is still exact, and keeping the same object
+        #lets CachedSource.save skip the disk write and the response rebuild
+        previous = calendar_cache.data
+        if not changed and previous is not None and calendar_cache.data_params == calendar_cache.current_params():
+            return previous
+    else:
+        events_by_calendar = list_calendars_full(service, windows)
+
+    #the local event store holds the whole sync horizon, so incremental results still need cutting down to each window
+    filter_window = CALENDAR_SYNC_MODE == "incremental"
 
     today_events, upcoming_events = [], []
 
-    #get today's events from "Classes" calendar
-    classes_result = service.events().list(
-        calendarId='f68d2ac45e9ac7aba185ad08cc6d511542196634c495bca2cff141cf13e8e22f@group.calendar.google.com',
-        timeMin=start_today,
-        timeMax=end_today,
-        timeZone='America/New_York',
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-
-    for e in classes_result.get('items', []):
-        #parse event start time and summary
-        dt = datetime.fromisoformat(e['start'].get('dateTime', e['start'].get('date')).replace('Z', '')).astimezone(tz)
-        today_events.append({'start': dt.strftime('%I:%M %p'), 'summary': e.get('summary', 'No Title')})
-
-    #get upcoming events from "Other" calendar
-    daniel_result = service.events().list(
-        calendarId='9cf36c61af86479abe999f348c513dcdc1a190a54b22038fbba2f274401c8261@group.calendar.google.com',
-        timeMin=start_future,
-        timeMax=end_future,
-        timeZone='America/New_York',
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-
-    for e in daniel_result.get('items', []):
-        #Parse date, start time, and summary
-        dt = datetime.fromisoformat(e['start'].get('dateTime', e['start'].get('date')).replace('Z', '')).astimezone(tz)
-        upcoming_events.append({'date': dt.strftime('%A, %B %d'), 'start': dt.strftime('%I:%M %p'), 'summary': e.get('summary', 'No Title')})
+    for index, calendar in enumerate(CALENDARS):
+        time_min, time_max = windows[calendar['window']]
+        for e in events_by_calendar.get(index, []):
+            dt = event_start(e, tz)
+            if filter_window and not time_min <= dt <= time_max:
+                continue
+            if calendar['window'] == 'today':
+                today_events.append((dt, {'start': dt.strftime('%I:%M %p'), 'summary': e.get('summary', 'No Title')}))
+            else:
+                upcoming_events.append((dt, {'date': dt.strftime('%A, %B %d'), 'start': dt.strftime('%I:%M %p'), 'summary': e.get('summary', 'No Title')}))
 
+    #merge calendars sharing a window in start time order
+    today_events.sort(key=lambda event: event[0])
+    upcoming_events.sort(key=lambda event: event[0])
+
+    return {'today': [event for _, event in today_events], 'upcoming': [event for _, event in upcoming_events]}
+
+#"today" and the 90 day window move every day, so today's date is part of the cache key
+calendar_cache = CachedSource('calendar', fetch_calendar, CALENDAR_CACHE_TTL, CALENDAR_REFRESH_INTERVAL, CALENDAR_REFRESH_JITTER,
+                              params=lambda: {'date': date.today().isoformat(), 'calendars': [c['id'] for c in CALENDARS]},
+                              store=cache_store, on_update=lambda data: prepare_payload('calendar', (data,), lambda: data))
+
+@app.route('/calendar_data')
+def get_calendar_events():
     #return today's and upcoming events as JSON
-    return jsonify({'today': today_events, 'upcoming': upcoming_events})
+    data = calendar_cache.get()
+    return prepared_payload('calendar', (data,), lambda: data).response()
+
+'''
+Dashboard Data Route
+1. /dashboard_data returns several module payloads in one response, so a combined view or a pre-warming mirror needs one round trip
+2. ?modules=stocks,sports,calendar,spotify picks the modules (default: all of them), ?window=1m etc. is passed on to stocks
+3. Every module comes from the same cache as its own route, all requested modules are read in parallel
+   - the response waits on the slowest module instead of the sum of all of them
+4. A module that fails is left out and its error is listed under "errors", the other modules are still sent
+5. Same ETag / 304 / compression as the other data routes (data_response)
+6. Weather is not included: home.js asks Open-Meteo straight from the browser, the server never has that data
+'''
+def dashboard_stocks(args):
+    return stock_window(stock_cache.get(), args.get('window', '5d'))
+
+def dashboard_sports(args):
+    return sports_payload(games_cache.get(), standings_cache.get())
+
+def dashboard_calendar(args):
+    return calendar_cache.get()
+
+def dashboard_spotify(args):
+    spotify = get_spotify()
+    token_info = spotify.token()
+    if not token_info:
+        #a combined response can't redirect to the login page, /spotify_data still does
+        raise PermissionError("Spotify is not logged in, open /spotify_data to log in")
+    return format_playback(inflight.do('spotify', spotify.client.current_playback))
+
+DASHBOARD_MODULES = {
+    'stocks': dashboard_stocks,
+    'sports': dashboard_sports,
+    'calendar': dashboard_calendar,
+    'spotify': dashboard_spotify,
+}
+
+def dashboard_modules(value):
+    #?modules=a,b -> module names in the order asked (every module if empty), ValueError for unknown names
+    names = [name.strip() for name in (value or '').split(',') if name.strip()] or list(DASHBOARD_MODULES)
+    unknown = [name for name in names if name not in DASHBOARD_MODULES]
+    if unknown:
+        raise ValueError(f"Unknown modules: {', '.join(unknown)} (available: {', '.join(DASHBOARD_MODULES)})")
+    return list(dict.fromkeys(names))
+
+@app.route('/dashboard_data')
+def dashboard_data():
+    try:
+        names = dashboard_modules(request.args.get('modules'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    #request.args only exists in this thread, the workers get a plain copy
+    args = request.args.to_dict()
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        futures = {name: pool.submit(DASHBOARD_MODULES[name], args) for name in names}
+
+    payload, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            payload[name] = future.result()
+        except Exception as e:
+            print(f"Error building {name} data for /dashboard_data: {e}")
+            errors[name] = str(e)
+    payload['errors'] = errors
+    return data_response(payload)
+
+'''
+Background Prefetch Scheduler
+1. Starts one daemon thread per cached source
+2. Each thread refreshes its source every interval (+/- jitter), which is shorter than the TTL
+3. Routes therefore always find a warm cache and never wait on Alpha Vantage, Sportradar or Google
+4. Sources restored warm from the persistent cache wait until they are due instead of refetching on boot
+5. Fetch errors are logged and retried on the next cycle, the previous cached data stays in place
+6. Set PREFETCH_ENABLED=0 in .env to disable (routes will then fetch on demand like before)
+'''
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+prefetch_sources = [stock_cache, games_cache, standings_cache, calendar_cache]
+
+def prefetch_loop(source):
+    #data loaded from disk on boot may still be good, only refetch once it is actually due
+    time.sleep(source.time_until_refresh())
+    while True:
+        try:
+            source.refresh()
+            print(f"Prefetched {source.name} data")
+        except Exception as e:
+            print(f"Error prefetching {source.name} data: {e}")
+        time.sleep(source.next_delay())
+
+def start_prefetch_scheduler():
+    for source in prefetch_sources:
+        threading.Thread(target=prefetch_loop, args=(source,), name=f"prefetch-{source.name}", daemon=True).start()
+
+if PREFETCH_ENABLED:
+    start_prefetch_scheduler()
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+    #development server, use gunicorn -c gunicorn.conf.py app:app on the mirror
+    app.run(host='0.0.0.0', port=5000, threaded=True)
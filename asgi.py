@@ -0,0 +1,367 @@
+'''
+Smart Mirror ASGI Server (async data routes)
+
+1. /stocks_data, /sports_data, /spotify_data, /calendar_data and /dashboard_data are served by async handlers,
+   so requests waiting on a slow upstream don't each hold a server thread
+2. Upstream calls go through one shared httpx.AsyncClient (keep-alive connection pool, per-upstream timeouts)
+3. Same caches as app.py (CachedSource): fresh and stale-while-revalidate hits return without any upstream call,
+   simultaneous misses share one upstream fetch, failed refreshes fall back exactly like the Flask routes
+   - misses join the same single-flight calls as the prefetch threads (app.inflight), a key is never fetched twice at once
+4. Blocking work runs in worker threads, never on the event loop: SQLite reads/writes, saving and preparing payloads,
+   and the whole calendar refresh (Google's client library is blocking and its connection isn't thread-safe)
+5. Every other route (pages, /set_page, /page_events, static files) is passed through to the Flask app
+6. The prefetch scheduler from app.py keeps running in its own threads
+
+Run: uvicorn asgi:app --host 0.0.0.0 --port 5000
+ or: gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+'''
+
+import os
+import asyncio
+import hashlib
+from urllib.parse import parse_qs
+
+import httpx
+from a2wsgi import WSGIMiddleware
+
+import app as mirror
+from cache_store import make_key
+
+#connection pool shared by every upstream
+ASGI_MAX_CONNECTIONS = int(os.getenv("ASGI_MAX_CONNECTIONS", 20))
+ASGI_MAX_KEEPALIVE = int(os.getenv("ASGI_MAX_KEEPALIVE", 10))
+#threads running the Flask routes that are passed through (same as the gunicorn thread count)
+ASGI_WSGI_THREADS = int(os.getenv("MIRROR_THREADS", 16))
+
+#per-upstream timeouts in seconds (connect is kept short so a dead host fails fast)
+UPSTREAM_TIMEOUTS = {
+    'alphavantage': httpx.Timeout(10, connect=3),
+    'sportradar': httpx.Timeout(10, connect=3),
+    'spotify': httpx.Timeout(5, connect=2),
+}
+
+client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=ASGI_MAX_CONNECTIONS, max_keepalive_connections=ASGI_MAX_KEEPALIVE)
+)
+
+'''
+AsyncSingleFlight
+
+async version of app.SingleFlight: callers for the same key await one shared task
+the task is shielded so a client disconnecting doesn't cancel the fetch for everyone else
+'''
+class AsyncSingleFlight:
+    def __init__(self):
+        self.calls = {}
+
+    async def do(self, key, fn):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        return await asyncio.shield(task)
+
+inflight = AsyncSingleFlight()
+
+'''
+AsyncCachedSource
+
+wraps a CachedSource from app.py with an async fetch function
+memory, persistent store, SWR and error fallbacks are all the CachedSource's own
+refreshes go through app.inflight, the same single-flight the prefetch threads and Flask routes use:
+- nobody is fetching the key: this task leads, fetches with httpx and saves (disk + prepared response) in a worker thread
+- a thread is already fetching it: one worker thread waits for that result (async callers for the key share the wait)
+fetch=None: the source's own blocking refresh runs in a worker thread (it joins app.inflight by itself)
+'''
+class AsyncCachedSource:
+    def __init__(self, source, fetch=None):
+        self.source = source
+        self.fetch = fetch
+        self.revalidating = None
+
+    async def refresh(self):
+        if self.fetch is None:
+            return await inflight.do(self.source.name, lambda: asyncio.to_thread(self.source.refresh))
+        params = self.source.current_params()
+        key = make_key(self.source.name, params)
+        return await inflight.do(key, lambda: self.lead_or_join(key, params))
+
+    async def lead_or_join(self, key, params):
+        call, leader = mirror.inflight.begin(key)
+        if not leader:
+            return await asyncio.to_thread(wait_for_call, call)
+
+        try:
+            data = await self.fetch()
+            data = await asyncio.to_thread(self.source.save, params, data)
+        except asyncio.CancelledError:
+            #threads waiting on this key must not hang
+            mirror.inflight.finish(key, call, error=RuntimeError(f"{self.source.name} refresh was cancelled"))
+            raise
+        except Exception as e:
+            mirror.inflight.finish(key, call, error=e)
+            raise
+        mirror.inflight.finish(key, call, result=data)
+        return data
+
+    async def revalidate(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            print(f"Error refreshing {self.source.name} data, keeping cached copy: {e}")
+
+    async def get(self):
+        source = self.source
+        if source.is_fresh():
+            return source.data
+        #params changed (ex. new day), another run may already have saved them
+        if source.data_params != source.current_params():
+            await asyncio.to_thread(source.load)
+            if source.is_fresh():
+                return source.data
+        #expired but not too old: return it now and refresh in the background (one task per source)
+        if mirror.STALE_WHILE_REVALIDATE and source.is_usable_stale():
+            if self.revalidating is None or self.revalidating.done():
+                self.revalidating = asyncio.ensure_future(self.revalidate())
+            return source.data
+        try:
+            return await self.refresh()
+        except Exception as e:
+            return source.recover(e)
+
+'''
+Async Upstream Fetches
+same request, quota and parsing code as the Flask routes, only the HTTP call is async
+quota reservations can wait on a rate limit, so they run in a worker thread
+'''
+def wait_for_call(call):
+    #blocking wait for a single-flight call led by another thread (run in a worker thread)
+    call.done.wait()
+    return call.outcome()
+
+async def fetch_stock_symbol(symbol):
+    last_day = await asyncio.to_thread(mirror.stock_history.last_day, symbol)
+    session = mirror.last_completed_session()
+    #latest close is already stored (or the market was closed), nothing new to download
+    if not await asyncio.to_thread(mirror.stock_session_due, symbol, last_day, session):
+        return await asyncio.to_thread(mirror.stock_chart, symbol)
+
+    url = mirror.stock_url(symbol, last_day)
+    print(f"Fetching {symbol}: {url}")
+    if await asyncio.to_thread(mirror.reserve_stock_call, symbol, last_day):
+        r = await client.get(url, timeout=UPSTREAM_TIMEOUTS['alphavantage'])
+        await asyncio.to_thread(mirror.store_stock_series, symbol, last_day, r.json(), session)
+    return await asyncio.to_thread(mirror.stock_chart, symbol)
+
+async def fetch_stocks():
+    #all symbols at once, merged back in the original order
+    results = await asyncio.gather(*(fetch_stock_symbol(symbol) for symbol in mirror.STOCK_SYMBOLS))
+    return dict(zip(mirror.STOCK_SYMBOLS, results))
+
+async def fetch_conditional(name, path, parse, ttl):
+    stored, headers = await asyncio.to_thread(mirror.conditional_headers, name, path)
+    await asyncio.to_thread(mirror.sportradar_quota.acquire)
+    response = await client.get(mirror.sports_url(path), headers=headers, timeout=UPSTREAM_TIMEOUTS['sportradar'])
+    return await asyncio.to_thread(mirror.conditional_payload, name, path, parse, ttl, stored, response)
+
+async def fetch_games():
+    return await fetch_conditional('games', mirror.games_path(), mirror.parse_games, mirror.SPORTS_CACHE_TTL)
+
+async def fetch_standings():
+    return await fetch_conditional('standings', mirror.standings_path(), mirror.parse_standings, mirror.STANDINGS_CACHE_TTL)
+
+async def current_playback(spotify, token_info):
+    response = await client.get(f"{spotify.client.prefix}me/player",
+                                headers={'Authorization': f"Bearer {token_info['access_token']}"},
+                                timeout=UPSTREAM_TIMEOUTS['spotify'])
+    #204: nothing playing
+    if response.status_code == 204:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+stock_cache = AsyncCachedSource(mirror.stock_cache, fetch_stocks)
+games_cache = AsyncCachedSource(mirror.games_cache, fetch_games)
+standings_cache = AsyncCachedSource(mirror.standings_cache, fetch_standings)
+#blocking Google client: the whole refresh (fetch + save) runs in a worker thread through app.inflight
+calendar_cache = AsyncCachedSource(mirror.calendar_cache)
+
+'''
+Async Data Routes
+each returns (status, headers, body), or a PreparedJSON from app.py for payloads prebuilt at refresh time
+'''
+#same headers the Flask after_request hook adds to routes without their own policy
+NO_CACHE_HEADERS = [
+    (b'cache-control', b'no-cache, no-store, must-revalidate'),
+    (b'pragma', b'no-cache'),
+    (b'expires', b'0'),
+]
+
+def json_response(data):
+    #serialized by Flask's JSON provider with jsonify's compact separators, so the body matches byte for byte
+    body = mirror.app.json.dumps(data, separators=(',', ':')).encode() + b'\n'
+    #same ETag + revalidate policy as app.data_response
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'.encode()
+    return 200, [(b'content-type', b'application/json'), (b'cache-control', b'no-cache'), (b'etag', etag)], body
+
+def compress_json(scope, headers, body):
+    #same negotiation and compressed-body cache as app.data_response, the ETag names the encoding sent
+    version = dict(headers)[b'etag'].decode().strip('"')
+    accept_encoding = dict(scope['headers']).get(b'accept-encoding', b'').decode()
+    body, encoding = mirror.negotiate_compression(body, version, accept_encoding)
+    headers = [(name, value) for name, value in headers if name != b'etag'] + [(b'vary', b'Accept-Encoding')]
+    if encoding is not None:
+        headers.append((b'content-encoding', encoding.encode()))
+        version = f"{version}-{encoding}"
+    return headers + [(b'etag', f'"{version}"'.encode())], body
+
+def prepared_response(scope, prepared):
+    #prebuilt body + ETag for the client's Accept-Encoding, nothing is serialized or compressed here
+    accept_encoding = dict(scope['headers']).get(b'accept-encoding', b'').decode()
+    body, etag, encoding = prepared.variant(accept_encoding)
+    headers = [(b'content-type', b'application/json'), (b'cache-control', b'no-cache'), (b'vary', b'Accept-Encoding')]
+    if encoding is not None:
+        headers.append((b'content-encoding', encoding.encode()))
+    return 200, headers + [(b'etag', f'"{etag}"'.encode())], body
+
+def not_modified(scope, headers):
+    #the browser already has this exact payload (If-None-Match lists its ETag)
+    etag = dict(headers).get(b'etag')
+    if_none_match = dict(scope['headers']).get(b'if-none-match')
+    if etag is None or if_none_match is None:
+        return False
+    return if_none_match.strip() == b'*' or etag in [tag.strip() for tag in if_none_match.split(b',')]
+
+async def prepared_payload(name, sources, build):
+    #normally prepared at refresh time, a first hit on data restored from disk prepares it in a worker thread
+    prepared = mirror.prepared_payloads.get(name)
+    if prepared is not None and prepared.matches(sources):
+        return prepared
+    return await asyncio.to_thread(mirror.prepared_payload, name, sources, build)
+
+def redirect_response(url):
+    return 302, [(b'location', url.encode())] + NO_CACHE_HEADERS, b''
+
+async def stocks_data(query):
+    window = query.get('window', ['5d'])[0]
+    data = await stock_cache.get()
+    if window == '5d' or window not in mirror.STOCK_WINDOWS:
+        return await prepared_payload('stocks', (data,), lambda: data)
+    return json_response(await asyncio.to_thread(mirror.stock_window, data, window))
+
+async def sports_data(query):
+    #schedule and standings are independent, fetch them side by side
+    games, divisions = await asyncio.gather(games_cache.get(), standings_cache.get())
+    return await prepared_payload('sports', (games, divisions), lambda: mirror.sports_payload(games, divisions))
+
+async def calendar_data(query):
+    data = await calendar_cache.get()
+    return await prepared_payload('calendar', (data,), lambda: data)
+
+async def spotify_data(query):
+    spotify = mirror.get_spotify()
+    #token is in memory, it only touches the network when it is due for a refresh
+    token_info = await asyncio.to_thread(spotify.token)
+    if not token_info:
+        return redirect_response(spotify.oauth.get_authorize_url())
+    song = await inflight.do('spotify', lambda: current_playback(spotify, token_info))
+    return json_response(mirror.format_playback(song))
+
+#/dashboard_data: same modules, errors and response as the Flask route, the modules are awaited side by side
+async def dashboard_stocks(args):
+    return await asyncio.to_thread(mirror.stock_window, await stock_cache.get(), args.get('window', '5d'))
+
+async def dashboard_sports(args):
+    games, divisions = await asyncio.gather(games_cache.get(), standings_cache.get())
+    return mirror.sports_payload(games, divisions)
+
+async def dashboard_calendar(args):
+    return await calendar_cache.get()
+
+async def dashboard_spotify(args):
+    spotify = mirror.get_spotify()
+    token_info = await asyncio.to_thread(spotify.token)
+    if not token_info:
+        raise PermissionError("Spotify is not logged in, open /spotify_data to log in")
+    song = await inflight.do('spotify', lambda: current_playback(spotify, token_info))
+    return mirror.format_playback(song)
+
+DASHBOARD_MODULES = {
+    'stocks': dashboard_stocks,
+    'sports': dashboard_sports,
+    'calendar': dashboard_calendar,
+    'spotify': dashboard_spotify,
+}
+
+async def dashboard_data(query):
+    try:
+        names = mirror.dashboard_modules(query.get('modules', [''])[0])
+    except ValueError as e:
+        body = mirror.app.json.dumps({'error': str(e)}).encode()
+        return 400, [(b'content-type', b'application/json')] + NO_CACHE_HEADERS, body
+
+    args = {name: values[0] for name, values in query.items()}
+    results = await asyncio.gather(*(DASHBOARD_MODULES[name](args) for name in names), return_exceptions=True)
+    payload, errors = {}, {}
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            print(f"Error building {name} data for /dashboard_data: {result}")
+            errors[name] = str(result)
+        else:
+            payload[name] = result
+    payload['errors'] = errors
+    return json_response(payload)
+
+ASYNC_ROUTES = {
+    '/stocks_data': stocks_data,
+    '/sports_data': sports_data,
+    '/calendar_data': calendar_data,
+    '/spotify_data': spotify_data,
+    '/dashboard_data': dashboard_data,
+}
+
+'''
+ASGI Application
+'''
+flask_app = WSGIMiddleware(mirror.app, workers=ASGI_WSGI_THREADS)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    route = ASYNC_ROUTES.get(scope.get('path')) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+    if route is None:
+        return await flask_app(scope, receive, send)
+
+    try:
+        result = await route(parse_qs(scope['query_string'].decode()))
+    except Exception as e:
+        print(f"Error serving {scope['path']}: {e}")
+        result = 500, [(b'content-type', b'text/plain')], b'Internal Server Error'
+
+    if isinstance(result, mirror.PreparedJSON):
+        status, headers, body = prepared_response(scope, result)
+    else:
+        status, headers, body = result
+        if status == 200 and dict(headers).get(b'etag') is not None:
+            headers, body = compress_json(scope, headers, body)
+    if status == 200 and not_modified(scope, headers):
+        #304 keeps the validators but sends no body
+        status, body = 304, b''
+        headers = [(name, value) for name, value in headers if name in (b'cache-control', b'etag', b'vary')]
+
+    if status != 304:
+        headers = headers + [(b'content-length', str(len(body)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
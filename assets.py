@@ -0,0 +1,148 @@
+'''
+Static Asset Pipeline
+1. build_assets() copies every file in static/ into static/dist/ under a content-hashed name (style.css -> style.3f9a1c2e04.css)
+   - a changed file gets a new name, so the browser can keep every asset cached forever and still never show a stale one
+2. Bundles join several files into one (ex. conditional_fetch.js + sports.js -> sports.bundle.js), one request per page
+3. CSS can be minified: comments, indentation and blank lines are stripped
+   - JS is left as is: without a real tokenizer, stripping lines can change strings and template literals,
+     and gzip/brotli already remove most of what whitespace costs
+4. Text assets (CSS, JS, SVG, ...) also get precompressed .gz and .br copies (brotli only if installed, see compression.py)
+5. Returns the manifest (logical name -> hashed name), also saved to static/dist/manifest.json
+6. Files already built are reused, files left over from older builds are deleted
+   - the build before this one is kept (KEEP_BUILDS): during a graceful reload the old worker's pages still link to it
+'''
+
+import os
+import re
+import json
+import hashlib
+
+from compression import ENCODINGS, compress, pick_encoding
+
+#file types worth compressing (images are already compressed)
+COMPRESSIBLE_TYPES = ('.css', '.js', '.html', '.svg', '.json', '.txt')
+HASH_LENGTH = 10
+#file suffix of each precompressed variant
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+MANIFEST_NAME = 'manifest.json'
+#hashed names of the last few builds, newest first
+BUILD_HISTORY_NAME = 'builds.json'
+#builds whose files stay on disk (and are served): this one + the one a draining worker may still be using
+KEEP_BUILDS = 2
+
+'''
+Minifiers
+'''
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line) + '\n'
+
+MINIFIERS = {'.css': minify_css}
+
+'''
+Build
+'''
+def hashed_name(name, data):
+    root, ext = os.path.splitext(name)
+    return f"{root}.{hashlib.md5(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+def read_asset(source_dir, name, minify):
+    with open(os.path.join(source_dir, name), 'rb') as f:
+        data = f.read()
+    minifier = MINIFIERS.get(os.path.splitext(name)[1])
+    if minify and minifier is not None:
+        data = minifier(data.decode('utf-8')).encode('utf-8')
+    return data
+
+def write_file(path, data):
+    #temp file + rename so a worker never serves half a file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def build_assets(source_dir, output_dir, bundles=None, minify=True):
+    #logical name -> processed bytes, for every file in static/ (the output folder itself is skipped)
+    outputs = {}
+    for root, folders, files in os.walk(source_dir):
+        folders[:] = [folder for folder in folders if os.path.join(root, folder) != output_dir]
+        for file in files:
+            name = os.path.relpath(os.path.join(root, file), source_dir).replace(os.sep, '/')
+            outputs[name] = read_asset(source_dir, name, minify)
+
+    for bundle, parts in (bundles or {}).items():
+        #";" between scripts so a file without a trailing semicolon can't run into the next one
+        separator = b'\n;\n' if bundle.endswith('.js') else b'\n'
+        outputs[bundle] = separator.join(read_asset(source_dir, part, minify) for part in parts)
+
+    manifest = {}
+    for name, data in outputs.items():
+        hashed = hashed_name(name, data)
+        manifest[name] = hashed
+        path = os.path.join(output_dir, hashed)
+        #same name means same content, nothing to redo
+        if not os.path.exists(path):
+            write_file(path, data)
+
+        if not name.endswith(COMPRESSIBLE_TYPES):
+            continue
+        for encoding in ENCODINGS:
+            variant = hashed + ENCODING_SUFFIXES[encoding]
+            if os.path.exists(os.path.join(output_dir, variant)):
+                continue
+            compressed = compress(data, encoding)
+            #tiny files can come out bigger, those are only served uncompressed
+            if len(compressed) < len(data):
+                write_file(os.path.join(output_dir, variant), compressed)
+
+    write_file(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    current = sorted(set(manifest.values()))
+    history = [current] + [build for build in read_build_history(output_dir) if build != current]
+    write_file(os.path.join(output_dir, BUILD_HISTORY_NAME), json.dumps(history[:KEEP_BUILDS]).encode())
+    remove_old_builds(output_dir, history[:KEEP_BUILDS])
+    return manifest
+
+def read_build_history(output_dir):
+    try:
+        with open(os.path.join(output_dir, BUILD_HISTORY_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+def remove_old_builds(output_dir, builds):
+    #keeps every file of the given builds (and their compressed copies), deletes the rest
+    keep = {MANIFEST_NAME, BUILD_HISTORY_NAME}
+    for build in builds:
+        for hashed in build:
+            keep.add(hashed)
+            keep.update(hashed + suffix for suffix in ENCODING_SUFFIXES.values())
+    for root, folders, files in os.walk(output_dir):
+        for file in files:
+            name = os.path.relpath(os.path.join(root, file), output_dir).replace(os.sep, '/')
+            #temp files belong to a build that may still be running
+            if name not in keep and not name.endswith('.tmp'):
+                os.remove(os.path.join(root, file))
+
+'''
+served_assets
+
+hashed names of every build still on disk (current + kept ones), the files /assets/ may send
+'''
+def served_assets(output_dir):
+    return {hashed for build in read_build_history(output_dir) for hashed in build}
+
+'''
+asset_variant
+
+picks the precompressed copy of a built file the client accepts
+returns (path, content encoding), encoding is None for the plain file
+'''
+def asset_variant(output_dir, hashed, accept_encoding):
+    path = os.path.join(output_dir, hashed)
+    available = [encoding for encoding in ENCODINGS if os.path.exists(path + ENCODING_SUFFIXES[encoding])]
+    encoding = pick_encoding(accept_encoding, available)
+    if encoding is None:
+        return path, None
+    return path + ENCODING_SUFFIXES[encoding], encoding
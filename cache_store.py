@@ -0,0 +1,202 @@
+'''
+Persistent Cache Store
+1. Saves upstream API responses to disk so they survive restarts (startup.sh, refresh.sh)
+2. Entries are keyed by source name (stocks, sports, ...) and the request parameters used to fetch them
+3. Every entry keeps TTL metadata (when it was fetched and how long it stays valid)
+4. Two backends: SQLite (default) and one JSON file per entry
+5. open_cache_store() picks the backend, app.py only talks to the CacheStore interface
+'''
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+'''
+make_key
+
+builds a stable key from source name + request parameters
+same params in a different order give the same key
+'''
+def make_key(source, params=None):
+    return f"{source}:{json.dumps(params or {}, sort_keys=True)}"
+
+'''
+CacheEntry
+
+one stored response: the data, when it was fetched and its TTL in seconds
+'''
+class CacheEntry:
+    def __init__(self, data, fetched_at, ttl):
+        self.data = data
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def is_fresh(self):
+        return self.age() < self.ttl
+
+'''
+CacheStore
+
+base interface for every backend
+get returns a CacheEntry or None, set overwrites the entry for that source + params
+'''
+class CacheStore:
+    def get(self, source, params=None):
+        raise NotImplementedError
+
+    def set(self, source, params, data, ttl, fetched_at=None):
+        raise NotImplementedError
+
+    def delete(self, source, params=None):
+        raise NotImplementedError
+
+'''
+SQLiteCacheStore
+
+single database file, one row per key
+a new connection is opened per call so it is safe to use from the prefetch threads
+'''
+class SQLiteCacheStore(CacheStore):
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, source TEXT, data TEXT, fetched_at REAL, ttl REAL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, source, params=None):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT data, fetched_at, ttl FROM cache WHERE key = ?", (make_key(source, params),)
+            ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def set(self, source, params, data, ttl, fetched_at=None):
+        fetched_at = fetched_at or time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, source, data, fetched_at, ttl) VALUES (?, ?, ?, ?, ?)",
+                (make_key(source, params), source, json.dumps(data), fetched_at, ttl)
+            )
+
+    def delete(self, source, params=None):
+        with self._connect() as db:
+            db.execute("DELETE FROM cache WHERE key = ?", (make_key(source, params),))
+
+'''
+JSONFileCacheStore
+
+one JSON file per key inside a folder (file name is a hash of the key)
+files are written to a temp file first and swapped in so a power cut never leaves half a file
+'''
+class JSONFileCacheStore(CacheStore):
+    def __init__(self, folder):
+        self.folder = folder
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, source, params):
+        digest = hashlib.sha1(make_key(source, params).encode()).hexdigest()[:16]
+        return os.path.join(self.folder, f"{source}_{digest}.json")
+
+    def get(self, source, params=None):
+        try:
+            with open(self._path(source, params), 'r') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return CacheEntry(entry['data'], entry['fetched_at'], entry['ttl'])
+
+    def set(self, source, params, data, ttl, fetched_at=None):
+        path = self._path(source, params)
+        entry = {'data': data, 'fetched_at': fetched_at or time.time(), 'ttl': ttl}
+        with self.lock:
+            with open(path + '.tmp', 'w') as f:
+                json.dump(entry, f)
+            os.replace(path + '.tmp', path)
+
+    def delete(self, source, params=None):
+        try:
+            os.remove(self._path(source, params))
+        except FileNotFoundError:
+            pass
+
+'''
+open_cache_store
+
+backend: "sqlite" or "json"
+path: database file for sqlite, folder for json
+'''
+def open_cache_store(backend, path):
+    if backend == "sqlite":
+        return SQLiteCacheStore(path)
+    if backend == "json":
+        return JSONFileCacheStore(path)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+'''
+TimeSeriesStore
+
+append-only daily price history per symbol (SQLite, one row per symbol + trading day)
+1. append only writes days that are new (or re-written if the close for that day changed)
+2. series reads any window back (last N trading days or everything since a date) without calling the API
+'''
+class TimeSeriesStore:
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS prices ("
+                "symbol TEXT, day TEXT, close REAL, PRIMARY KEY (symbol, day))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def last_day(self, symbol):
+        #most recent stored trading day as "YYYY-MM-DD", or None if nothing stored yet
+        with self._connect() as db:
+            row = db.execute("SELECT MAX(day) FROM prices WHERE symbol = ?", (symbol,)).fetchone()
+        return row[0]
+
+    def append(self, symbol, points):
+        #points: iterable of (day, close)
+        with self._connect() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO prices (symbol, day, close) VALUES (?, ?, ?)",
+                [(symbol, day, close) for day, close in points]
+            )
+
+    def series(self, symbol, since=None, limit=None):
+        #returns [(day, close), ...] oldest first
+        #since: only days on/after this date, limit: only the most recent N days
+        query = "SELECT day, close FROM prices WHERE symbol = ?"
+        args = [symbol]
+        if since is not None:
+            query += " AND day >= ?"
+            args.append(since)
+        query += " ORDER BY day DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            args.append(limit)
+        with self._connect() as db:
+            rows = db.execute(query, args).fetchall()
+        return rows[::-1]
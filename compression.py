@@ -0,0 +1,84 @@
+'''
+Compression Helpers
+1. gzip is always available, brotli only if the brotli package is installed (pip install brotli)
+2. ENCODINGS lists the encodings this server can produce, best first
+3. compress() encodes bytes, fast=True trades some size for speed (for payloads compressed while serving)
+4. pick_encoding() reads a request's Accept-Encoding header and picks the best encoding both sides support
+5. CompressionCache keeps compressed copies of response bodies, so the same payload is never compressed twice
+'''
+
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def compress(data, encoding, fast=False):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5 if fast else 11)
+    if encoding == 'gzip':
+        #mtime=0 so the same input always gives the same bytes
+        return gzip.compress(data, compresslevel=6 if fast else 9, mtime=0)
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+def accepted_encodings(accept_encoding):
+    #encodings named in Accept-Encoding, minus the ones explicitly refused with q=0
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name or refused(params):
+            continue
+        accepted.add(name)
+    return accepted
+
+def refused(params):
+    #";q=0" means "never send me this"
+    quality = params.strip().replace(' ', '')
+    if not quality.startswith('q='):
+        return False
+    try:
+        return float(quality[2:]) == 0
+    except ValueError:
+        return False
+
+def pick_encoding(accept_encoding, available=None):
+    #best encoding from available (default ENCODINGS) the client accepts, None for identity
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in available if available is not None else ENCODINGS:
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+'''
+CompressionCache
+
+compressed response bodies keyed by payload version (ex. a hash of the body) + encoding
+each version is compressed once per encoding, later requests for it reuse the bytes
+the least recently used entries are dropped past max_entries (old versions are never asked for again)
+'''
+class CompressionCache:
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, version, encoding, data):
+        key = (version, encoding)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        #compressed outside the lock, two requests racing on a new version just both do the work once
+        compressed = compress(data, encoding, fast=True)
+        with self.lock:
+            self.entries[key] = compressed
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return compressed
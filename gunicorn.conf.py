@@ -0,0 +1,30 @@
+'''
+Gunicorn Config (production serving mode for app.py)
+1. Replaces Flask's development server (app.run / flask run) for the always-on mirror
+2. Workers and threads are configurable from the environment (MIRROR_WORKERS, MIRROR_THREADS)
+3. Graceful reload: kill -HUP $(cat /tmp/smart-mirror-gunicorn.pid) starts fresh workers with the new code,
+   old workers finish their requests before exiting
+
+Start: gunicorn -c gunicorn.conf.py app:app   (from the smart-mirror folder, pip install gunicorn first)
+'''
+
+import os
+
+bind = os.getenv("MIRROR_BIND", "0.0.0.0:5000")
+
+#current page, /page_events listeners and the data caches live inside the worker process,
+#so keep 1 worker (the mirror and the remote must talk to the same one) and scale with threads
+workers = int(os.getenv("MIRROR_WORKERS", 1))
+worker_class = "gthread"
+#every open /page_events stream holds one thread
+threads = int(os.getenv("MIRROR_THREADS", 16))
+
+#close idle keep-alive connections after a few seconds
+keepalive = 5
+#restart a worker that stops responding, give old workers time to finish on reload/shutdown
+timeout = 30
+graceful_timeout = 10
+
+pidfile = "/tmp/smart-mirror-gunicorn.pid"
+errorlog = "-"
+loglevel = "info"
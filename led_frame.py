@@ -0,0 +1,77 @@
+'''
+LED Frame Fill
+1. adafruit_dotstar strips are adafruit_pixelbuf.PixelBuf objects, on the Pi that is the pure Python version
+2. PixelBuf.fill() still calls _set_item once per pixel (parse, bounds check, brightness math and 4 byte writes each)
+3. fill_frame() encodes the color once, repeats those bytes over the whole strip and writes them in one slice assignment
+   - same bytes fill() would write: pixel order, DotStar luminance byte and brightness scaling all come from the strip
+   - both buffers are kept in sync (the one show() sends and the unscaled copy PixelBuf keeps when brightness < 1)
+4. The header (start frame) and trailer (end frame) are never touched
+5. fill_frame() relies on PixelBuf's private attributes (checked against adafruit-circuitpython-pixelbuf 2.1.0)
+   - call fill_frame_supported(strip) once after creating the strip and use strip.fill() if it returns False,
+     so a library upgrade that renames them only makes fills slower instead of breaking the script
+'''
+
+#PixelBuf internals fill_frame reads or writes
+REQUIRED_ATTRIBUTES = ('_parse_color', '_post_brightness_buffer', '_pre_brightness_buffer', '_offset', '_bytes',
+                       '_bpp', '_byteorder', '_dotstar_mode', 'brightness', 'auto_write')
+
+'''
+fill_frame_supported
+
+True if strip has everything fill_frame needs, and a test fill gives the same bytes as strip.fill()
+leaves the strip's buffer the way it was (nothing is sent)
+'''
+def fill_frame_supported(strip):
+    if not all(hasattr(strip, name) for name in REQUIRED_ATTRIBUTES):
+        return False
+    try:
+        post = bytearray(strip._post_brightness_buffer)
+        pre = None if strip._pre_brightness_buffer is None else bytearray(strip._pre_brightness_buffer)
+        auto_write = strip.auto_write
+        strip.auto_write = False
+        try:
+            strip.fill((12, 34, 56))
+            expected = bytes(strip._post_brightness_buffer)
+            fill_frame(strip, (12, 34, 56))
+            return bytes(strip._post_brightness_buffer) == expected
+        finally:
+            strip._post_brightness_buffer[:] = post
+            if pre is not None:
+                strip._pre_brightness_buffer[:] = pre
+            strip.auto_write = auto_write
+    except Exception:
+        return False
+
+'''
+encode_pixel
+
+4 (or 3) bytes for one pixel in the strip's byte order
+scale: brightness multiplier for r, g, b (and white on RGBW strips), the DotStar luminance byte is never scaled
+'''
+def encode_pixel(strip, r, g, b, w, scale):
+    pixel = bytearray(strip._bpp)
+    order = strip._byteorder
+    pixel[order[0]] = int(r * scale)
+    pixel[order[1]] = int(g * scale)
+    pixel[order[2]] = int(b * scale)
+    if strip._bpp == 4:
+        pixel[order[3]] = w if strip._dotstar_mode else int(w * scale)
+    return bytes(pixel)
+
+'''
+fill_frame
+
+sets every pixel of strip to color (same color formats as PixelBuf.fill), call show() afterwards to send it
+'''
+def fill_frame(strip, color):
+    r, g, b, w = strip._parse_color(color)
+    start = strip._offset
+    end = start + strip._bytes
+    count = len(strip)
+
+    strip._post_brightness_buffer[start:end] = encode_pixel(strip, r, g, b, w, strip.brightness) * count
+    #only exists once brightness was set below 1 (used by brightness changes and reading pixels back)
+    if strip._pre_brightness_buffer is not None:
+        strip._pre_brightness_buffer[start:end] = encode_pixel(strip, r, g, b, w, 1) * count
+    if strip.auto_write:
+        strip.show()
@@ -1,12 +1,14 @@
 '''
 Motion Sensor Detection and LED Control Script
 1. Initializes distance sensor and LED strip; GPIO for motion sensor and SPI for LEDs
-2. Constantly monitors distance to detect presence (similar to test distance script)
+2. Constantly monitors distance to detect presence (echo edges are caught by GPIO interrupts instead of busy-waiting)
+   - a dropped echo or a spike doesn't end a visit, the person only counts as gone after ABSENCE_GRACE seconds
 3. Blinks LEDs white 5 times when motion detected within trigger distance
 4. Turns on HDMI display if a person stays for 3 seconds, and breaks if they move away
 5. Increases LED brightness gradually when display turns on
+   - blink/fade/ramp animations run on their own thread (LedAnimator) so distance sampling never pauses
 6. Turns off HDMI display after 10 minutes of inactivity
-7. Listens for manual color override from Flask via color.txt file for /remote LED slider control
+7. Listens for manual color override from Flask over a Unix socket for /remote LED slider control (color.txt is only read once on boot)
 8. Restores LED state appropriately based on motion and override
 9. Cleans up GPIO and LED resources on exit for no clutter and unwanted LED flashing
 '''
@@ -14,8 +16,13 @@ Motion Sensor Detection and LED Control Script
 import RPi.GPIO as GPIO
 import time
 import os
+import socket
+import select
+import threading
+import itertools
 import board
 import adafruit_dotstar
+from led_frame import fill_frame, fill_frame_supported
 
 '''
 Motion Sensor Setup (GPIO)
@@ -32,6 +39,10 @@ LED_COUNT = 72
 LED_BRIGHTNESS = 0.05
 #SCLK for Clock, MOSI for Data
 leds = adafruit_dotstar.DotStar(board.SCLK, board.MOSI, LED_COUNT, brightness=LED_BRIGHTNESS, auto_write=False)
+#fill_frame writes the library's buffer directly, fall back to leds.fill() if this library version doesn't match
+FAST_FILL = fill_frame_supported(leds)
+if not FAST_FILL:
+    print("LED library internals changed: using leds.fill()")
 
 '''
 Config Vars: distance in cm, time in seconds
@@ -39,30 +50,76 @@ Config Vars: distance in cm, time in seconds
 TRIGGER_DISTANCE = 20
 STAND_TIME_REQUIRED = 3
 DISPLAY_ON_DURATION = 600
+#readings can be missing or out of range this long before the person counts as gone
+#(the sensor drops echoes and spikes now and then, one bad reading must not end the visit)
+ABSENCE_GRACE = 0.5
 
 COLOR_FILE = "/home/pi/smart-mirror/color.txt"
+#app.py sends new colors here as soon as they are posted from /remote
+COLOR_SOCKET = "/tmp/smart-mirror-led.sock"
 last_color = (0, 0, 0)
+manual_color = (0, 0, 0)
 manual_override = False #VERY IMPORTANT: Need for /remote override
 
 start_time = None
+#last time a reading was within TRIGGER_DISTANCE
+last_seen = None
 display_on = False
 on_timer_start = None
 blinking = False
-blink_start_time = None
-blink_count = 0
-blinking_now = False
+#color currently on the strip (start point for fades)
+shown_color = (0, 0, 0)
 
 GPIO.setup(TRIG, GPIO.OUT)
 GPIO.setup(ECHO, GPIO.IN)
 
 '''
-get_distance
+Distance Measurement Setup
+EDGE_TRIGGERED = True: echo edges are timestamped by a GPIO callback, get_distance just waits on an event (no CPU spinning)
+EDGE_TRIGGERED = False: old busy-wait polling of the echo pin
+ECHO_TIMEOUT: seconds the polling version waits for a full echo pulse before giving up
+EDGE_ECHO_TIMEOUT: same for the edge version, just over the sensor's longest echo (~38 ms when nothing is in range),
+so a missed edge only costs one sample
+'''
+EDGE_TRIGGERED = True
+ECHO_TIMEOUT = 2
+EDGE_ECHO_TIMEOUT = 0.04
+#the sensor can't measure closer than this (cm), shorter pulses mean both edges reached the callback at once
+MIN_DISTANCE = 2
+
+#timestamps of the echo edges seen since the current trigger pulse, in order (rising, falling)
+echo_edges = []
+#perf_counter when the current trigger pulse finished, None while no measurement is running
+echo_armed_at = None
+echo_done = threading.Event()
 
-1. Measure distance from motion sensor
-2. Sends trigger pulse and listens for echo
-3. returns distance in cm or none if fail
 '''
-def get_distance():
+on_echo_edge
+
+GPIO callback for both edges of the echo pin
+edges are paired by order after the trigger: the first one starts the pulse, the second one ends it
+(the pin level isn't re-read: by the time the callback runs a short echo may already be over)
+edges from before the trigger finished (ex. the tail of a pulse that timed out) are dropped
+uses perf_counter (monotonic, high resolution) so wall clock changes never affect readings
+'''
+def on_echo_edge(channel):
+    now = time.perf_counter()
+    armed_at = echo_armed_at
+    if armed_at is None or now < armed_at:
+        return
+    echo_edges.append(now)
+    if len(echo_edges) >= 2:
+        echo_done.set()
+
+if EDGE_TRIGGERED:
+    GPIO.add_event_detect(ECHO, GPIO.BOTH, callback=on_echo_edge)
+
+'''
+send_trigger_pulse
+
+let the sensor settle, then send a 10us trigger pulse
+'''
+def send_trigger_pulse():
     GPIO.output(TRIG, False)
     time.sleep(0.05)
 
@@ -70,87 +127,276 @@ def get_distance():
     time.sleep(0.00001)
     GPIO.output(TRIG, False)
 
+'''
+pulse_to_distance
+
+converts echo pulse length in seconds to cm
+'''
+def pulse_to_distance(pulse_duration):
+    #converstion factor for cm is 17150
+    distance = pulse_duration * 17150
+    return round(distance, 2)
+
+'''
+get_distance
+
+1. Measure distance from motion sensor
+2. Sends trigger pulse and listens for echo
+3. returns distance in cm or none if fail
+'''
+def get_distance():
+    if not EDGE_TRIGGERED:
+        return get_distance_polling()
+
+    global echo_armed_at
+    #stop taking edges, then forget the ones from the last reading before triggering a new one
+    echo_armed_at = None
+    echo_done.clear()
+    echo_edges.clear()
+
+    send_trigger_pulse()
+    echo_armed_at = time.perf_counter()
+
+    #sleep until the callback has seen both edges of the echo
+    got_echo = echo_done.wait(EDGE_ECHO_TIMEOUT)
+    echo_armed_at = None
+    if not got_echo:
+        return None
+
+    pulse_start, pulse_end = echo_edges[0], echo_edges[1]
+    distance = pulse_to_distance(pulse_end - pulse_start)
+    return distance if distance >= MIN_DISTANCE else None
+
+'''
+get_distance_polling
+
+old busy-wait version of get_distance (spins on the echo pin)
+'''
+def get_distance_polling():
+    send_trigger_pulse()
+
     pulse_start = None
     pulse_end = None
 
-    timeout = time.time() + 2
+    timeout = time.perf_counter() + ECHO_TIMEOUT
 
     while GPIO.input(ECHO) == 0:
-        pulse_start = time.time()
-        if time.time() > timeout:
+        pulse_start = time.perf_counter()
+        if pulse_start > timeout:
             return None
 
     while GPIO.input(ECHO) == 1:
-        pulse_end = time.time()
-        if time.time() > timeout:
+        pulse_end = time.perf_counter()
+        if pulse_end > timeout:
             return None
 
     if pulse_start is not None and pulse_end is not None:
-        pulse_duration = pulse_end - pulse_start
-        #converstion factor for cm is 17150
-        distance = pulse_duration * 17150
-        return round(distance, 2)
+        return pulse_to_distance(pulse_end - pulse_start)
     return None
 
 '''
 set_all_leds
 
 sets all leds in the strip to a specific color
+fill_frame() writes the whole pixel section of the frame in one assignment (leds.fill() still sets pixels one by one),
+then show() pushes it to the strip in one SPI write
 '''
 def set_all_leds(color):
-    for i in range(LED_COUNT):
-        leds[i] = color
+    global shown_color
+    if FAST_FILL:
+        fill_frame(leds, color)
+    else:
+        leds.fill(color)
     leds.show()
+    shown_color = color
+
+'''
+LED Animations
+each animation is a generator of (color, seconds to hold it) frames
+LedAnimator plays them on a background thread
+'''
+#frames per second for smooth fades
+FRAME_RATE = 30
+WHITE = (255, 255, 255)
+OFF = (0, 0, 0)
 
 '''
-blink_leds_once
+blink
 
-blink all LEDs to white briefly then turn off.
+blink color on/off a number of times, then settle on end_color
 white is 255 255 255
 black(off) is 0 0 0
 '''
-def blink_leds_once():
-    set_all_leds((255, 255, 255))
-    time.sleep(0.2)
-    set_all_leds((0, 0, 0))
-    time.sleep(0.8)
+def blink(color, on_time, off_time, times, end_color=OFF):
+    for count in range(1, times + 1):
+        print(f"Blink {count}")
+        yield color, on_time
+        yield OFF, off_time
+    yield end_color, 0
+
+'''
+fade
+
+smooth linear fade from start to end color over duration seconds
+'''
+def fade(start, end, duration):
+    frames = max(1, int(duration * FRAME_RATE))
+    for frame in range(1, frames + 1):
+        t = frame / frames
+        yield tuple(round(a + (b - a) * t) for a, b in zip(start, end)), duration / frames
 
 '''
-increase_brightness
+ramp
 
-Gradually increase brightness of LEDs to max
+step from start to end color in a few visible steps, holding each one for step_time
 Used when display is turning on
 '''
-def increase_brightness():
-    current_brightness = int(LED_BRIGHTNESS * 255)
-    increment = 255 // 5
+def ramp(start, end, steps, step_time):
+    for step in range(1, steps + 1):
+        t = step / steps
+        yield tuple(round(a + (b - a) * t) for a, b in zip(start, end)), step_time
 
-    while current_brightness < 255:
-        current_brightness += increment
-        if current_brightness > 255:
-            current_brightness = 255
-        set_all_leds((current_brightness, current_brightness, current_brightness))
-        time.sleep(0.5)
+'''
+LedAnimator
+
+1. play() starts an animation right away, interrupting whatever was playing
+2. stop() cancels the current animation, once it returns the thread won't touch the strip again
+3. frames are written under a lock and the thread sleeps on an event, so play/stop wake it up instantly
+'''
+class LedAnimator:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.frames = None
+        threading.Thread(target=self.run, name="led-animator", daemon=True).start()
+
+    def play(self, frames):
+        with self.lock:
+            self.frames = iter(frames)
+        self.wake.set()
+
+    def stop(self):
+        with self.lock:
+            self.frames = None
+        self.wake.set()
+
+    def is_running(self):
+        return self.frames is not None
+
+    def run(self):
+        hold = None
+        while True:
+            #sleep until the next frame is due (or forever if idle), play/stop cut it short
+            self.wake.wait(hold)
+            self.wake.clear()
+            with self.lock:
+                step = next(self.frames, None) if self.frames is not None else None
+                if step is None:
+                    self.frames = None
+                    hold = None
+                    continue
+                color, hold = step
+                set_all_leds(color)
+
+animator = LedAnimator()
+
+'''
+resting_color
+
+color the strip goes back to when no animation is playing
+manual color from /remote if one was set, otherwise off
+'''
+def resting_color():
+    return manual_color if manual_override else OFF
+
+'''
+parse_color
+
+converts a hex string like "#ff0000" to an (r, g, b) tuple
+returns None if empty or not valid
+'''
+def parse_color(color_hex):
+    color_hex = color_hex.strip().lstrip('#')
+    if len(color_hex) != 6:
+        return None
+    try:
+        return tuple(int(color_hex[i:i+2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return None
+
+'''
+apply_color
+
+manual color override from /remote
+only touches the strip if the color actually changed
+'''
+def apply_color(rgb):
+    global last_color, manual_color, manual_override
+    if rgb is not None and rgb != last_color:
+        #a color from /remote always wins over a running animation
+        animator.stop()
+        set_all_leds(rgb)
+        last_color = rgb
+        manual_color = rgb
+        manual_override = True
+
+'''
+open_color_socket
+
+Unix datagram socket that app.py writes new colors to
+non-blocking so checking it never stalls the sensor loop
+'''
+def open_color_socket():
+    #remove socket left over from a previous run
+    try:
+        os.remove(COLOR_SOCKET)
+    except FileNotFoundError:
+        pass
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(COLOR_SOCKET)
+    sock.setblocking(False)
+    return sock
+
+'''
+check_color_updates
+
+applies every color waiting on the socket (no file I/O)
+'''
+def check_color_updates():
+    while True:
+        try:
+            message = color_socket.recv(64)
+        except BlockingIOError:
+            return
+        apply_color(parse_color(message.decode(errors='ignore')))
+
+'''
+wait_for_color
+
+sleeps up to timeout seconds but wakes up as soon as a new color is posted
+'''
+def wait_for_color(timeout):
+    ready, _, _ = select.select([color_socket], [], [], timeout)
+    if ready:
+        check_color_updates()
 
 #turn off all LEDs on boot/startup
 set_all_leds((0, 0, 0))
 
+color_socket = open_color_socket()
+
+#restore last color chosen from /remote (only file read, done once on boot)
+try:
+    with open(COLOR_FILE, 'r') as f:
+        apply_color(parse_color(f.read()))
+#if color.txt is not found, pass
+except FileNotFoundError:
+    pass
+
 try:
     while True:
         #check for manual color ovverride from /remote
-        try:
-            with open(COLOR_FILE, 'r') as f:
-                color_hex = f.read().strip()
-                if color_hex:
-                    color_hex = color_hex.lstrip('#')
-                    rgb = tuple(int(color_hex[i:i+2], 16) for i in (0, 2, 4))
-                    if rgb != last_color:
-                        set_all_leds(rgb)
-                        last_color = rgb
-                        manual_override = True
-        #if color.txt is not found, pass
-        except FileNotFoundError:
-            pass
+        check_color_updates()
 
         '''
         Distance Sensor and Motion Logic
@@ -159,59 +405,40 @@ try:
         now = time.time()
 
         if distance is not None and distance <= TRIGGER_DISTANCE:
-            #if person is detected within trigger distance, start blinking
-            if not blinking and not display_on:
+            last_seen = now
+            #if person just walked up, start blinking 5 times (runs in the background, sensing keeps going)
+            if start_time is None and not display_on:
                 blinking = True
-                blink_start_time = now
-                blink_count = 0
                 start_time = now
-
-            #blink 5 times, set while loop to true
-            if blinking and blink_count < 5:
-                if not blinking_now and now - blink_start_time >= blink_count:
-                    blink_leds_once()
-                    blinking_now = True
-                    blink_count += 1
-                    print(f"Blink {blink_count}")
-                elif blinking_now and now - blink_start_time >= blink_count:
-                    blinking_now = False
-
-            #after blinking 5 times, break loop
-            if blink_count >= 5:
-                blinking = False
-                #restore manual color if needed from /remote
-                if manual_override:
-                    try:
-                        with open(COLOR_FILE, 'r') as f:
-                            color_hex = f.read().strip()
-                            if color_hex:
-                                color_hex = color_hex.lstrip('#')
-                                rgb = tuple(int(color_hex[i:i+2], 16) for i in (0, 2, 4))
-                                set_all_leds(rgb)
-                                last_color = rgb
-                    except FileNotFoundError:
-                        set_all_leds((0, 0, 0))
-                else:
-                    set_all_leds((0, 0, 0))
+                animator.play(blink(WHITE, 0.2, 0.8, 5, resting_color()))
 
             #if person stands for 3 seconds, turn display on
-            if not display_on and now - start_time >= STAND_TIME_REQUIRED:
+            if not display_on and start_time is not None and now - start_time >= STAND_TIME_REQUIRED:
                 #use xrandr to turn display on and immediately rotate right: using auto would reset orientation to landscape
                 os.system("xrandr --output HDMI-1 --mode 2560x1440 --rotate right")
                 display_on = True
                 on_timer_start = now
                 if not manual_override:
-                    increase_brightness()
-
-        else:
-            #no person detected
+                    #interrupts the blink: ramp up to full white, then fade back to off
+                    blinking = False
+                    start_level = int(LED_BRIGHTNESS * 255)
+                    animator.play(itertools.chain(
+                        ramp((start_level,) * 3, WHITE, 5, 0.5),
+                        fade(WHITE, resting_color(), 1.0)
+                    ))
+
+        elif last_seen is None or now - last_seen >= ABSENCE_GRACE:
+            #no person detected for a while: cut the blink short and go back to resting color
             if blinking:
                 blinking = False
-                blink_count = 0
-                blinking_now = False
-                if not manual_override:
-                    set_all_leds((0, 0, 0))
+                animator.stop()
+                set_all_leds(resting_color())
             start_time = None
+            last_seen = None
+
+        #blink animation finished on its own
+        if blinking and not animator.is_running():
+            blinking = False
 
         #auto sleep after 10 min
         if display_on and now - on_timer_start >= DISPLAY_ON_DURATION:
@@ -220,17 +447,24 @@ try:
             display_on = False
             start_time = None
             blinking = False
-            blink_count = 0
-            blinking_now = False
             if not manual_override:
-                set_all_leds((0, 0, 0))
+                animator.play(fade(shown_color, OFF, 1.0))
 
-        time.sleep(0.05)
+        #sleep, but apply a color from /remote right away if one comes in
+        wait_for_color(0.05)
 
 except KeyboardInterrupt:
     #manual exit
     print("Ctrl+C. Exiting")
 
 finally:
+    animator.stop()
+    if EDGE_TRIGGERED:
+        GPIO.remove_event_detect(ECHO)
+    color_socket.close()
+    try:
+        os.remove(COLOR_SOCKET)
+    except FileNotFoundError:
+        pass
     leds.deinit()
     GPIO.cleanup()
\ No newline at end of file
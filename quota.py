@@ -0,0 +1,132 @@
+'''
+Upstream API Quotas
+1. TokenBucket: short-term rate limit (ex. Sportradar trial allows about 1 request per second)
+2. QuotaBudget: daily and/or monthly call budget per upstream (Alpha Vantage 25/day, Sportradar 1000/month)
+   - usage counts are saved in the persistent cache store so restarts don't reset them
+   - acquire() raises QuotaExceeded instead of calling upstream once the budget is used up
+3. planned_interval() spreads the calls left in the current day/month evenly over the time left,
+   so refreshes stay as fresh as the quota allows without running out before the period resets
+'''
+
+import time
+import threading
+from datetime import datetime, timedelta
+
+class QuotaExceeded(Exception):
+    pass
+
+'''
+TokenBucket
+
+rate: tokens added per second, capacity: max burst
+'''
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _fill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1, timeout=0):
+        #take tokens, waiting up to timeout seconds for them to refill, returns False if they didn't
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._fill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+'''
+QuotaBudget
+
+name: upstream name (key in the cache store)
+per_day / per_month: call limits, None for no limit
+bucket: optional TokenBucket for the short-term rate limit
+'''
+class QuotaBudget:
+    def __init__(self, name, store, per_day=None, per_month=None, bucket=None, bucket_timeout=5):
+        self.name = name
+        self.store = store
+        self.per_day = per_day
+        self.per_month = per_month
+        self.bucket = bucket
+        self.bucket_timeout = bucket_timeout
+        self.lock = threading.Lock()
+        self.usage = self._load_usage()
+
+    def _load_usage(self):
+        entry = self.store.get('quota', {'name': self.name})
+        return entry.data if entry is not None else {}
+
+    def _current_usage(self, now):
+        #counters reset automatically when the day/month changes
+        day, month = now.strftime('%Y-%m-%d'), now.strftime('%Y-%m')
+        if self.usage.get('day') != day:
+            self.usage['day'], self.usage['day_count'] = day, 0
+        if self.usage.get('month') != month:
+            self.usage['month'], self.usage['month_count'] = month, 0
+        return self.usage
+
+    def remaining(self):
+        #calls left today and this month (None if that period has no limit)
+        with self.lock:
+            usage = self._current_usage(datetime.now())
+            day_left = self.per_day - usage['day_count'] if self.per_day else None
+            month_left = self.per_month - usage['month_count'] if self.per_month else None
+        return day_left, month_left
+
+    def acquire(self, calls=1):
+        #reserve calls before hitting upstream, raises QuotaExceeded if the budget or rate limit says no
+        with self.lock:
+            usage = self._current_usage(datetime.now())
+            if self.per_day and usage['day_count'] + calls > self.per_day:
+                raise QuotaExceeded(f"{self.name}: daily budget of {self.per_day} calls used up")
+            if self.per_month and usage['month_count'] + calls > self.per_month:
+                raise QuotaExceeded(f"{self.name}: monthly budget of {self.per_month} calls used up")
+            self._count(usage, calls)
+
+        if self.bucket is not None and not self.bucket.acquire(calls, self.bucket_timeout):
+            #call never happened, give the budget back
+            with self.lock:
+                self._count(self._current_usage(datetime.now()), -calls)
+            raise QuotaExceeded(f"{self.name}: rate limited")
+
+    def _count(self, usage, calls):
+        usage['day_count'] += calls
+        usage['month_count'] += calls
+        self.store.set('quota', {'name': self.name}, usage, 0)
+
+    def planned_interval(self, calls_per_refresh, share=1.0):
+        #seconds between refreshes so the calls left (times this source's share) last until the period resets
+        now = datetime.now()
+        day_left, month_left = self.remaining()
+        intervals = [0]
+
+        if day_left is not None:
+            end_of_day = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            intervals.append(self._spread(day_left * share, calls_per_refresh, (end_of_day - now).total_seconds()))
+
+        if month_left is not None:
+            next_month = (now.replace(day=1) + timedelta(days=32)).replace(day=1)
+            end_of_month = datetime.combine(next_month.date(), datetime.min.time())
+            intervals.append(self._spread(month_left * share, calls_per_refresh, (end_of_month - now).total_seconds()))
+
+        return max(intervals)
+
+    def _spread(self, calls_left, calls_per_refresh, seconds_left):
+        refreshes_left = int(calls_left // calls_per_refresh)
+        #nothing left: wait for the period to reset
+        if refreshes_left < 1:
+            return seconds_left
+        return seconds_left / refreshes_left
@@ -15,27 +15,26 @@ xrandr --output HDMI-1 --off
 #hide cursor using unclutter
 unclutter &
 
-#navigate to Flask app directory and run the server
+#navigate to Flask app directory and run the server (gunicorn, settings in gunicorn.conf.py)
 cd /home/pi/smart-mirror
-python3 app.py &
+gunicorn -c gunicorn.conf.py app:app &
 
 #wait for Flask to start
 sleep 5
 
-#kill and restart Chromium with cache-clearing options
+#kill and restart Chromium
+#the browser cache is kept: static files have content-hashed names (assets.py), so an edited file is always a new URL
 pkill chromium-browser
 
 sleep 1
 
-rm -rf ~/.cache/chromium
+#pkill counts as a crash, stop Chromium from showing the restore-pages bubble on the mirror
+sed -i 's/"exited_cleanly":false/"exited_cleanly":true/; s/"exit_type":"Crashed"/"exit_type":"Normal"/' ~/.config/chromium/Default/Preferences 2>/dev/null
 
 chromium-browser \
   --kiosk \
-  --incognito \
-  --disk-cache-size=1 \
-  --disable-application-cache \
-  --disable-offline-load-stale-cache \
-  --disable-gpu-program-cache \
+  --noerrdialogs \
+  --disable-session-crashed-bubble \
   http://localhost:5000/mirror &
 
 #start motionpower.py script
@@ -4,12 +4,13 @@ Calendar Events Fetcher
 2. Clears and updates today's events section dynamically
 3. Clears and updates upcoming events section dynamically
 4. Refreshes event data automatically every 30 seconds
+5. Unchanged events (304 from the server, see conditional_fetch.js) leave the page as it is
 */
 
 async function fetchCalendar() {
-  //send GET request to flask /calendar_data route
-  const res = await fetch("/calendar_data");
-  const data = await res.json();
+  //send GET request to flask /calendar_data route (null = same events already shown)
+  const data = await fetchIfChanged("/calendar_data");
+  if (data === null) return;
 
   //get references to the DOM containers for events
   const todayContainer = document.getElementById("today-events");
@@ -0,0 +1,35 @@
+/*
+Conditional Fetch (ETag / 304)
+1. Data routes (/stocks_data, /sports_data, /calendar_data, /spotify_data) send an ETag with every payload
+2. The last payload + ETag per URL is kept in sessionStorage, so it survives the mirror switching pages
+3. Every poll sends If-None-Match, an unchanged payload comes back as 304 with no body
+4. fetchIfChanged returns null if this page already shows that exact payload, so modules can skip rebuilding the DOM
+*/
+
+//ETag of the payload each URL last rendered on this page
+const shownEtags = {};
+
+async function fetchIfChanged(url) {
+  const stored = JSON.parse(sessionStorage.getItem(url) || 'null');
+
+  //no-store: the browser cache stays out of it, so a 304 reaches this code instead of being swapped for the cached copy
+  const res = await fetch(url, {
+    cache: 'no-store',
+    headers: stored ? { 'If-None-Match': stored.etag } : {}
+  });
+
+  let entry = stored;
+  if (res.status !== 304 || !stored) {
+    entry = { etag: res.headers.get('ETag'), data: await res.json() };
+    if (entry.etag) {
+      sessionStorage.setItem(url, JSON.stringify(entry));
+    }
+  }
+
+  //already on screen: nothing to redraw
+  if (entry.etag && shownEtags[url] === entry.etag) {
+    return null;
+  }
+  shownEtags[url] = entry.etag;
+  return entry.data;
+}
@@ -1,6 +1,6 @@
 /*
 Sports Module
-1. Fetches today's MLB games and current standings from Flask backend (/sports_data)
+1. Fetches today's MLB games and current standings from Flask backend (/sports_data, see conditional_fetch.js)
 2. Clears and updates games list
 3. Clears and updates standings table
 4. Displays fallback messages if no games or standings are available
@@ -9,9 +9,9 @@ Sports Module
 
 async function loadSports() {
     try {
-        //send GET request to flask /sports_data route
-        const res = await fetch('/sports_data');
-        const data = await res.json();
+        //send GET request to flask /sports_data route (null = already rendered, 304)
+        const data = await fetchIfChanged('/sports_data');
+        if (data === null) return;
 
         //get references to DOM element
         const gamesDiv = document.getElementById('games');
@@ -4,12 +4,13 @@ Spotify Module
 2. Updates song name, artist name, album name, and playback device dynamically on the page
 3. Updates the album cover image if available
 4. Automatically fetches and updates song information every 15 seconds
+5. Skips the update when the song info hasn't changed (304, see conditional_fetch.js)
 */
 
 async function getSong() {
-  //send get request to Flask /spotify_data route
-  const res = await fetch("/spotify_data");
-  const data = await res.json();
+  //send get request to Flask /spotify_data route (null = nothing changed)
+  const data = await fetchIfChanged("/spotify_data");
+  if (data === null) return;
 
   //update DOM elements with current song info
   updateSong(data);
@@ -1,8 +1,8 @@
 /*
 Stocks Module (Chart.js Integration)
-1. Fetches recent stock data from Flask backend (/stocks_data)
+1. Fetches recent stock data from Flask backend (/stocks_data, see conditional_fetch.js)
 2. Dynamically creates a Chart.js line graph for each stock symbol
-3. Displays stock closing prices for the last 5 days
+3. Displays stock closing prices for the last 5 days (or ?window=1m/3m/6m/1y on the page URL)
 4. Handles cases where no data is available (displays placeholders)
 5. Charts are styled for dark backgrounds(white text, aqua line colors)
 */
@@ -94,9 +94,12 @@ const createChart = (symbol, labels, prices) => {
 
 (async () => {
   try {
-    //fetch all stock data from backend
-    const res = await fetch('/stocks_data');
-    const allData = await res.json();
+    //chart window from the page URL (ex. /stocks?window=1m), defaults to last 5 days
+    const chartWindow = new URLSearchParams(window.location.search).get('window') || '5d';
+
+    //fetch all stock data from backend (null = already rendered, 304)
+    const allData = await fetchIfChanged(`/stocks_data?window=${chartWindow}`);
+    if (allData === null) return;
 
     //create chart for each stock
     for (let symbol in allData) {
@@ -0,0 +1,158 @@
+'''
+Benchmark for /calendar_data (cold vs warm Google Calendar service)
+1. Starts a local fake Google server: a small discovery document, an events list endpoint and the batch endpoint
+2. Points app.py at it with CALENDAR_DISCOVERY_URL (no Google account or quota needed)
+3. Cold request: credentials + discovery document + building the service + listing events
+4. Warm request: reuses the in-memory credentials and the built service, only lists events
+   (in incremental sync mode the fake server answers syncToken requests with "no changes")
+5. Prints the time and downloaded bytes for each
+
+Run from the smart-mirror folder: python3 test_scripts/bench_calendar.py
+'''
+
+import os
+import sys
+import time
+import json
+import threading
+import email
+import tempfile
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#simulated network round trip per request in seconds
+MOCK_LATENCY = 0.05
+WARM_RUNS = 10
+
+server_url = None
+#bytes of event data sent by the fake server
+bytes_sent = [0]
+
+def discovery_document():
+    #just enough of the real calendar v3 discovery doc for events().list()
+    query = {"location": "query", "type": "string"}
+    return {
+        "kind": "discovery#restDescription",
+        "discoveryVersion": "v1",
+        "id": "calendar:v3",
+        "name": "calendar",
+        "version": "v3",
+        "rootUrl": f"{server_url}/",
+        "servicePath": "calendar/v3/",
+        "batchPath": "batch/calendar/v3",
+        "parameters": {},
+        "schemas": {"Events": {"id": "Events", "type": "object"}},
+        "resources": {
+            "events": {
+                "methods": {
+                    "list": {
+                        "id": "calendar.events.list",
+                        "path": "calendars/{calendarId}/events",
+                        "httpMethod": "GET",
+                        "parameters": {
+                            "calendarId": {"location": "path", "type": "string", "required": True},
+                            "timeMin": query,
+                            "timeMax": query,
+                            "timeZone": query,
+                            "orderBy": query,
+                            "pageToken": query,
+                            "syncToken": query,
+                            "singleEvents": {"location": "query", "type": "boolean"},
+                            "showDeleted": {"location": "query", "type": "boolean"}
+                        },
+                        "parameterOrder": ["calendarId"],
+                        "response": {"$ref": "Events"}
+                    }
+                }
+            }
+        }
+    }
+
+def events_page(query):
+    #incremental request: nothing changed since the last sync
+    if "syncToken" in query:
+        return {"items": [], "nextSyncToken": "sync-2"}
+    items = [
+        {"id": f"event{i}", "status": "confirmed", "summary": f"Event {i}",
+         "start": {"dateTime": f"2030-01-{i % 28 + 1:02}T{i % 12 + 8:02}:00:00-05:00"}}
+        for i in range(20)
+    ]
+    return {"items": items, "nextSyncToken": "sync-1"}
+
+class FakeGoogle(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(MOCK_LATENCY)
+        url = urlparse(self.path)
+        if url.path.startswith("/discovery"):
+            self.send_json(discovery_document())
+        else:
+            self.send_json(events_page(parse_qs(url.query)))
+
+    def do_POST(self):
+        #batch request: multipart/mixed body with one embedded HTTP request per calendar
+        time.sleep(MOCK_LATENCY)
+        raw = self.rfile.read(int(self.headers["Content-Length"]))
+        message = email.message_from_bytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw)
+        boundary = "batch_boundary"
+        parts = []
+        for part in message.get_payload():
+            content_id = part["Content-ID"].strip("<>")
+            #embedded request line: GET /calendar/v3/calendars/<id>/events?... HTTP/1.1
+            inner_url = urlparse(part.get_payload().split()[1])
+            body = json.dumps(events_page(parse_qs(inner_url.query)))
+            bytes_sent[0] += len(body)
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{body}\r\n"
+            )
+        data = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        #keep benchmark output clean
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGoogle)
+server_url = f"http://127.0.0.1:{server.server_port}"
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+#has to be set before app.py is imported
+os.environ["PREFETCH_ENABLED"] = "0"
+#throwaway event store so every run starts cold
+os.environ["CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_cache.db")
+os.environ["CALENDAR_DISCOVERY_URL"] = f"{server_url}/discovery/{{api}}/{{apiVersion}}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app
+from google.oauth2.credentials import Credentials
+
+#fake in-memory credentials instead of secrets/token.json
+app.calendar_service.creds = Credentials(token="fake-token")
+
+def timed_fetch():
+    bytes_sent[0] = 0
+    start = time.perf_counter()
+    result = app.fetch_calendar()
+    elapsed = time.perf_counter() - start
+    assert result["today"] is not None and result["upcoming"] is not None
+    return elapsed, bytes_sent[0]
+
+try:
+    print(f"Mock latency: {MOCK_LATENCY * 1000:.0f} ms per request, sync mode: {app.CALENDAR_SYNC_MODE}")
+    cold, cold_bytes = timed_fetch()
+    warm, warm_bytes = sorted(timed_fetch() for _ in range(WARM_RUNS))[WARM_RUNS // 2]
+    print(f"cold request (build service):  {cold * 1000:8.1f} ms  {cold_bytes:6} bytes of events")
+    print(f"warm request (median of {WARM_RUNS}):  {warm * 1000:8.1f} ms  {warm_bytes:6} bytes of events")
+finally:
+    server.shutdown()
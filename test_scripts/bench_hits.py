@@ -0,0 +1,84 @@
+'''
+Benchmark for cache hit latency on the data routes (serialize per request vs prepared response)
+1. Seeds the stock and sports caches with realistic payloads (4 symbols, 15 games, 6 divisions of 5 teams)
+2. "per request" builds the response like before: data_response (jsonify + SHA-1 ETag + compressed copy lookup)
+3. "prepared" serves the bytes built once at refresh time (PreparedJSON), the way the routes do now
+4. Both run inside a Flask request context with the same headers, so only the response building is measured
+5. Prints microseconds per hit for each route and encoding (br/gzip if the browser takes it, identity if not)
+
+Run from the smart-mirror folder: python3 test_scripts/bench_hits.py [--iterations 5000]
+'''
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+import io
+
+#don't start the prefetch threads when importing app.py
+os.environ["PREFETCH_ENABLED"] = "0"
+#throwaway cache + price history so the benchmark never touches the real ones
+bench_folder = tempfile.mkdtemp()
+os.environ["CACHE_PATH"] = os.path.join(bench_folder, "bench_cache.db")
+os.environ["STOCK_HISTORY_PATH"] = os.path.join(bench_folder, "bench_history.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app
+
+FAKE_STOCKS = {symbol: {"labels": [f"4/{day}" for day in range(21, 26)],
+                        "prices": [round(100 + day * 1.37, 2) for day in range(21, 26)]}
+               for symbol in app.STOCK_SYMBOLS}
+FAKE_GAMES = [{"away": f"Away City Team {n}", "home": f"Home City Team {n}", "time": "7:05 PM"} for n in range(15)]
+FAKE_DIVISIONS = [{"division_name": f"Division {d}",
+                   "teams": [{"rank": t + 1, "name": f"Team {d}-{t}", "wins": 80 - t * 4, "losses": 60 + t * 4,
+                              "win_p": f"{(80 - t * 4) / 140:.3f}", "games_back": t * 4.0, "last_10": f"{6 - t % 3}-{4 + t % 3}"}
+                             for t in range(5)]}
+                  for d in range(6)]
+
+#what a browser sends vs a client without compression
+ACCEPT_ENCODINGS = {"br": "gzip, deflate, br", "identity": ""}
+
+def time_hits(path, accept_encoding, build, iterations):
+    #average seconds to build one response for path
+    with app.app.test_request_context(path, headers={"Accept-Encoding": accept_encoding}):
+        build()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            build()
+        return (time.perf_counter() - start) / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache hit latency benchmark")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    #save() runs the same refresh hooks as a real prefetch, so the prepared payloads are built here
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.stock_cache.save(app.stock_cache.current_params(), FAKE_STOCKS)
+        app.games_cache.save(app.games_cache.current_params(), FAKE_GAMES)
+        app.standings_cache.save(app.standings_cache.current_params(), FAKE_DIVISIONS)
+
+    routes = {
+        "/stocks_data": (lambda: app.data_response(app.stock_cache.get()), app.stocks_data),
+        "/sports_data": (lambda: app.data_response({"games": app.games_cache.get(), "divisions": app.standings_cache.get()}),
+                         app.sports_data),
+    }
+
+    print(f"{args.iterations} hits per run")
+    print(f"{'route':>13} {'encoding':>9} {'body (B)':>9} {'per request (us)':>17} {'prepared (us)':>14} {'speedup':>8}")
+    for path, (per_request, prepared) in routes.items():
+        for label, accept_encoding in ACCEPT_ENCODINGS.items():
+            #both ways have to pick the same encoding (uncompressed bodies must match byte for byte)
+            with app.app.test_request_context(path, headers={"Accept-Encoding": accept_encoding}):
+                old, new = per_request(), prepared()
+                encoding = new.headers.get("Content-Encoding")
+                assert old.headers.get("Content-Encoding") == encoding
+                assert encoding is not None or old.get_data() == new.get_data()
+                size = len(new.get_data())
+            before = time_hits(path, accept_encoding, per_request, args.iterations)
+            after = time_hits(path, accept_encoding, prepared, args.iterations)
+            print(f"{path:>13} {label:>9} {size:>9} {before * 1e6:>17.1f} {after * 1e6:>14.1f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
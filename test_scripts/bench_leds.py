@@ -0,0 +1,84 @@
+'''
+Microbenchmark for set_all_leds (per-pixel indexing vs PixelBuf.fill vs one-slice fill_frame)
+1. Uses the real adafruit_pixelbuf.PixelBuf (the pure Python version adafruit_dotstar runs on the Pi),
+   set up like adafruit_dotstar.DotStar: PBGR byte order, 4 byte start frame, end frame, brightness 0.05
+2. Only _transmit is replaced (no SPI bus here), it just counts writes
+3. per-pixel: leds[i] = color for every pixel (the original loop)
+4. fill: leds.fill(color), which still calls _set_item once per pixel inside the library
+5. fill_frame: led_frame.fill_frame (what motionpower.py uses), one encoded pixel repeated over the buffer in one assignment
+6. All three must leave identical buffers, then CPU time per frame is printed for 72, 144 and 300 LEDs
+
+Needs adafruit_pixelbuf (pip install adafruit-circuitpython-pixelbuf), no Pi needed
+Run from the smart-mirror folder: python3 test_scripts/bench_leds.py
+'''
+
+import os
+import sys
+import time
+
+from adafruit_pixelbuf import PixelBuf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from led_frame import fill_frame
+
+LED_COUNTS = [72, 144, 300]
+FRAMES = 2000
+BRIGHTNESS = 0.05
+
+'''
+BenchStrip
+
+real PixelBuf with the same arguments adafruit_dotstar.DotStar passes, minus the SPI write
+'''
+class BenchStrip(PixelBuf):
+    def __init__(self, n, brightness):
+        trailer = bytearray(b"\xff" * ((n + 15) // 16))
+        super().__init__(n, byteorder="PBGR", brightness=brightness, auto_write=False,
+                         header=bytearray(4), trailer=trailer)
+        self.writes = 0
+
+    def _transmit(self, buffer):
+        #one SPI write of the whole frame
+        self.writes += 1
+
+def set_all_leds_per_pixel(leds, color):
+    for i in range(len(leds)):
+        leds[i] = color
+    leds.show()
+
+def set_all_leds_fill(leds, color):
+    leds.fill(color)
+    leds.show()
+
+def set_all_leds_fill_frame(leds, color):
+    fill_frame(leds, color)
+    leds.show()
+
+METHODS = [("per-pixel", set_all_leds_per_pixel), ("fill", set_all_leds_fill), ("fill_frame", set_all_leds_fill_frame)]
+
+def cpu_time_per_frame(set_all, count):
+    leds = BenchStrip(count, BRIGHTNESS)
+    colors = [(255, 255, 255), (0, 0, 0)]
+    start = time.process_time()
+    for frame in range(FRAMES):
+        set_all(leds, colors[frame % 2])
+    elapsed = time.process_time() - start
+    assert leds.writes == FRAMES
+    return elapsed / FRAMES
+
+#every way must produce the exact same frame (and the same unscaled copy)
+for count in LED_COUNTS:
+    strips = []
+    for _, set_all in METHODS:
+        strip = BenchStrip(count, BRIGHTNESS)
+        set_all(strip, (12, 34, 56))
+        strips.append(strip)
+    for strip in strips[1:]:
+        assert strip._post_brightness_buffer == strips[0]._post_brightness_buffer
+        assert strip._pre_brightness_buffer == strips[0]._pre_brightness_buffer
+
+print(f"{FRAMES} frames per run, CPU time per frame")
+print(f"{'LEDs':>6} {'per-pixel (us)':>15} {'fill (us)':>10} {'fill_frame (us)':>16} {'vs fill':>8}")
+for count in LED_COUNTS:
+    per_pixel, fill, one_slice = (cpu_time_per_frame(set_all, count) for _, set_all in METHODS)
+    print(f"{count:>6} {per_pixel * 1e6:>15.1f} {fill * 1e6:>10.1f} {one_slice * 1e6:>16.1f} {fill / one_slice:>7.1f}x")
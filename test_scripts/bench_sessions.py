@@ -0,0 +1,167 @@
+'''
+Benchmark for the shared upstream session (fresh connection per call vs keep-alive pool)
+1. Creates a throwaway self-signed certificate (openssl) and starts a local HTTPS mock of Alpha Vantage + Sportradar
+2. Points app.py at it and runs refresh cycles: 4 stock symbols + today's schedule + standings
+3. "fresh" mode calls requests.get for every call (new TCP + TLS handshake each time, like before the shared session)
+4. "pooled" mode uses app.upstream_session (handshake only on the first cycle, reused after that)
+5. Prints time per cycle, TLS handshakes per cycle and the time saved per refresh cycle
+   --rtt adds a simulated network round trip (TCP + TLS handshake = 2 round trips, each request = 1)
+
+Run from the smart-mirror folder: python3 test_scripts/bench_sessions.py [--rtt 0.03] [--cycles 10]
+'''
+
+import os
+import sys
+import ssl
+import time
+import json
+import argparse
+import tempfile
+import threading
+import subprocess
+import contextlib
+import io
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+#don't start the prefetch threads when importing app.py
+os.environ["PREFETCH_ENABLED"] = "0"
+#throwaway cache + price history so the benchmark never touches the real ones
+bench_folder = tempfile.mkdtemp()
+os.environ["CACHE_PATH"] = os.path.join(bench_folder, "bench_cache.db")
+os.environ["STOCK_HISTORY_PATH"] = os.path.join(bench_folder, "bench_history.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app
+
+CERT_FILE = os.path.join(bench_folder, "cert.pem")
+KEY_FILE = os.path.join(bench_folder, "key.pem")
+#simulated upstream processing time in seconds
+MOCK_LATENCY = 0.02
+
+#TLS connections accepted by the mock (one per handshake)
+handshakes = [0]
+rtt = 0
+
+FAKE_SERIES = {"Time Series (Daily)": {f"2025-04-{day:02}": {"4. close": f"{100 + day:.2f}"} for day in range(1, 31)}}
+FAKE_SCHEDULE = {"games": []}
+FAKE_STANDINGS = {"league": {"season": {"leagues": []}}}
+
+class MockUpstream(BaseHTTPRequestHandler):
+    #HTTP/1.1 so clients can keep the connection open
+    protocol_version = "HTTP/1.1"
+    #headers and body are separate writes, without this delayed ACKs stall every kept-alive response
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        #TCP + TLS handshake: 2 round trips before the first byte of the request
+        time.sleep(2 * rtt)
+        self.request.do_handshake()
+        super().setup()
+
+    def do_GET(self):
+        time.sleep(rtt + MOCK_LATENCY)
+        path = urlparse(self.path).path
+        if path.endswith("schedule.json"):
+            body = FAKE_SCHEDULE
+        elif path.endswith("standings.json"):
+            body = FAKE_STANDINGS
+        else:
+            body = FAKE_SERIES
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        #keep benchmark output clean
+        pass
+
+class TLSServer(ThreadingHTTPServer):
+    def __init__(self, address, handler, context):
+        super().__init__(address, handler)
+        self.context = context
+
+    def get_request(self):
+        #handshake runs in the handler thread (setup) so a slow handshake doesn't block accept
+        sock, address = self.socket.accept()
+        handshakes[0] += 1
+        return self.context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False), address
+
+class FreshConnections:
+    #stand-in for the old requests.get calls: new connection (and handshake) per call
+    def get(self, url, **kwargs):
+        return requests.get(url, **kwargs)
+
+def make_certificate():
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", KEY_FILE, "-out", CERT_FILE],
+        check=True, capture_output=True
+    )
+
+def refresh_cycle():
+    #one prefetch round for the sources that talk to Alpha Vantage + Sportradar
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.fetch_stocks()
+        app.fetch_games()
+        app.fetch_standings()
+
+def run(session, cycles):
+    app.upstream_session = session
+    #first cycle opens the pool, it is reported separately
+    start = time.perf_counter()
+    refresh_cycle()
+    first = time.perf_counter() - start
+
+    handshakes[0] = 0
+    start = time.perf_counter()
+    for _ in range(cycles):
+        refresh_cycle()
+    return first, (time.perf_counter() - start) / cycles, handshakes[0] / cycles
+
+def main():
+    global rtt
+    parser = argparse.ArgumentParser(description="Shared upstream session benchmark")
+    parser.add_argument("--rtt", type=float, default=0, help="simulated network round trip in seconds")
+    parser.add_argument("--cycles", type=int, default=10)
+    args = parser.parse_args()
+    rtt = args.rtt
+
+    make_certificate()
+    #trust the throwaway certificate (requests reads this for every call, session or not)
+    os.environ["REQUESTS_CA_BUNDLE"] = CERT_FILE
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(CERT_FILE, KEY_FILE)
+    server = TLSServer(("127.0.0.1", 0), MockUpstream, context)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base = f"https://127.0.0.1:{server.server_port}"
+    app.STOCK_API_URL = f"{base}/query"
+    app.SPORTS_API_URL = f"{base}/mlb"
+    #the mock has no quota, so lift the budgets and rate limits
+    for quota in (app.alpha_vantage_quota, app.sportradar_quota):
+        quota.per_day = quota.per_month = None
+        quota.bucket = None
+    #same per-host pool sizes as app.py, pointed at the mock host
+    app.mount_host(app.upstream_session, app.STOCK_API_URL, app.HostPolicy(pool_size=app.STOCK_FETCH_WORKERS, retries=0))
+    pooled_session = app.upstream_session
+
+    try:
+        print(f"Mock latency: {MOCK_LATENCY * 1000:.0f} ms, simulated RTT: {rtt * 1000:.0f} ms, "
+              f"{len(app.STOCK_SYMBOLS) + 2} calls per cycle, {args.cycles} cycles")
+        print(f"{'mode':>7} {'first cycle (ms)':>17} {'per cycle (ms)':>15} {'handshakes/cycle':>17}")
+        results = {}
+        for mode, session in [("fresh", FreshConnections()), ("pooled", pooled_session)]:
+            first, per_cycle, per_cycle_handshakes = run(session, args.cycles)
+            results[mode] = per_cycle
+            print(f"{mode:>7} {first * 1000:>17.1f} {per_cycle * 1000:>15.1f} {per_cycle_handshakes:>17.1f}")
+        print(f"saved per refresh cycle: {(results['fresh'] - results['pooled']) * 1000:.1f} ms")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+'''
+Benchmark for stock fetching (sequential vs concurrent)
+1. Starts a local mock Alpha Vantage server that answers TIME_SERIES_DAILY after a fixed delay
+2. Points app.py at the mock server instead of alphavantage.co (no API quota used)
+3. Fetches 4, 20 and 100 symbols with 1 worker (old one-at-a-time loop) and with the thread pool
+4. Prints wall-clock time for each run
+
+Run from the smart-mirror folder: python3 test_scripts/bench_stocks.py
+'''
+
+import os
+import sys
+import time
+import json
+import threading
+import contextlib
+import io
+import tempfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#don't start the prefetch threads when importing app.py
+os.environ["PREFETCH_ENABLED"] = "0"
+#throwaway cache + price history so the benchmark never touches the real ones
+bench_folder = tempfile.mkdtemp()
+os.environ["CACHE_PATH"] = os.path.join(bench_folder, "bench_cache.db")
+os.environ["STOCK_HISTORY_PATH"] = os.path.join(bench_folder, "bench_history.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app
+
+#simulated upstream response time in seconds
+MOCK_LATENCY = 0.2
+SYMBOL_COUNTS = [4, 20, 100]
+
+#fake daily time series with 30 trading days
+FAKE_SERIES = {
+    "Time Series (Daily)": {
+        f"2025-04-{day:02}": {"4. close": f"{100 + day:.2f}"} for day in range(1, 31)
+    }
+}
+
+class MockAlphaVantage(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(MOCK_LATENCY)
+        body = json.dumps(FAKE_SERIES).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        #keep benchmark output clean
+        pass
+
+def timed_fetch(symbols, workers):
+    start = time.perf_counter()
+    #hide the "Fetching ..." prints from app.py
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = app.fetch_stocks(symbols, workers)
+    elapsed = time.perf_counter() - start
+    assert len(result) == len(symbols)
+    return elapsed
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), MockAlphaVantage)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+app.STOCK_API_URL = f"http://127.0.0.1:{server.server_port}/query"
+#the mock has no quota, so lift the Alpha Vantage budget and rate limit
+app.alpha_vantage_quota.per_day = None
+app.alpha_vantage_quota.bucket = None
+
+print(f"Mock latency: {MOCK_LATENCY * 1000:.0f} ms per request, pool size: {app.STOCK_FETCH_WORKERS}")
+print(f"{'symbols':>8} {'sequential (s)':>15} {'concurrent (s)':>15} {'speedup':>8}")
+
+try:
+    for count in SYMBOL_COUNTS:
+        symbols = [f"SYM{i}" for i in range(count)]
+        sequential = timed_fetch(symbols, 1)
+        concurrent = timed_fetch(symbols, app.STOCK_FETCH_WORKERS)
+        print(f"{count:>8} {sequential:>15.2f} {concurrent:>15.2f} {sequential / concurrent:>7.1f}x")
+finally:
+    server.shutdown()
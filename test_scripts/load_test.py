@@ -0,0 +1,238 @@
+'''
+Load test for the Smart Mirror backend
+1. Starts one local fake upstream server for Alpha Vantage, Sportradar, Google Calendar and Spotify
+2. Starts app.py in a throwaway folder (fake tokens in secrets/, empty cache) pointed at the fake upstreams
+   - --server gunicorn (default): production mode from gunicorn.conf.py
+   - --server dev: Flask development server (python3 app.py)
+   - --server asgi: async data routes from asgi.py under uvicorn
+   - --url http://host:5000: skip both and test a server that is already running
+3. Hammers each route with CONCURRENCY clients for DURATION seconds
+4. Prints requests per second, p50 and p99 latency per route
+
+Run from the smart-mirror folder: python3 test_scripts/load_test.py [--server dev|asgi] [--concurrency 20] [--duration 10]
+Use --mock-latency 1 to see how each server copes with a slow upstream (/spotify_data calls it on every request)
+'''
+
+import os
+import sys
+import json
+import time
+import email
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUTES = ['/stocks_data', '/sports_data', '/calendar_data', '/spotify_data', '/current_page', '/static/style.css']
+#simulated upstream response time in seconds (--mock-latency)
+mock_latency = None
+
+'''
+Fake Upstream Payloads
+'''
+def stock_series():
+    return {"Time Series (Daily)": {f"2025-04-{day:02}": {"4. close": f"{100 + day:.2f}"} for day in range(1, 31)}}
+
+def schedule():
+    team = {"market": "Boston", "name": "Red Sox"}
+    return {"games": [{"away": team, "home": team, "scheduled": "2025-04-01T17:05:00+00:00"} for _ in range(15)]}
+
+def standings():
+    team = {"rank": {"division": 1}, "name": "Red Sox", "win": 10, "loss": 5, "win_p": 0.667,
+            "games_back": 0, "last_10_won": 7, "last_10_lost": 3}
+    division = {"name": "AL East", "teams": [team] * 5}
+    return {"league": {"season": {"leagues": [{"divisions": [division] * 3}] * 2}}}
+
+def calendar_discovery(root):
+    query = {"location": "query", "type": "string"}
+    parameters = {name: query for name in ["timeMin", "timeMax", "timeZone", "orderBy", "pageToken", "syncToken"]}
+    parameters.update({
+        "calendarId": {"location": "path", "type": "string", "required": True},
+        "singleEvents": {"location": "query", "type": "boolean"},
+        "showDeleted": {"location": "query", "type": "boolean"},
+    })
+    return {
+        "kind": "discovery#restDescription", "discoveryVersion": "v1", "id": "calendar:v3",
+        "name": "calendar", "version": "v3", "rootUrl": f"{root}/", "servicePath": "calendar/v3/",
+        "batchPath": "batch/calendar/v3", "parameters": {},
+        "schemas": {"Events": {"id": "Events", "type": "object"}},
+        "resources": {"events": {"methods": {"list": {
+            "id": "calendar.events.list", "path": "calendars/{calendarId}/events", "httpMethod": "GET",
+            "parameters": parameters, "parameterOrder": ["calendarId"], "response": {"$ref": "Events"}
+        }}}}
+    }
+
+def calendar_events():
+    start = time.strftime("%Y-%m-%dT12:00:00-05:00")
+    items = [{"id": f"event{i}", "status": "confirmed", "summary": f"Event {i}", "start": {"dateTime": start}}
+             for i in range(10)]
+    return {"items": items, "nextSyncToken": "sync"}
+
+def playback():
+    return {
+        "item": {"name": "Song", "duration_ms": 200000, "artists": [{"name": "Artist"}],
+                 "album": {"name": "Album", "images": [{"url": "https://example.com/cover.jpg"}]}},
+        "device": {"name": "Speaker"}, "progress_ms": 1000
+    }
+
+class FakeUpstreams(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(mock_latency)
+        path = urlparse(self.path).path
+        if path.startswith("/alphavantage"):
+            self.send_json(stock_series())
+        elif path.endswith("schedule.json"):
+            self.send_json(schedule())
+        elif path.endswith("standings.json"):
+            self.send_json(standings())
+        elif path.startswith("/discovery"):
+            self.send_json(calendar_discovery(f"http://{self.headers['Host']}"))
+        elif path.startswith("/spotify/me/player"):
+            self.send_json(playback())
+        else:
+            self.send_json(calendar_events())
+
+    def do_POST(self):
+        #Google batch request: one embedded events().list per calendar
+        time.sleep(mock_latency)
+        raw = self.rfile.read(int(self.headers["Content-Length"]))
+        message = email.message_from_bytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw)
+        parts = []
+        for part in message.get_payload():
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--batch\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{json.dumps(calendar_events())}\r\n"
+            )
+        self.send_body(("".join(parts) + "--batch--\r\n").encode(), "multipart/mixed; boundary=batch")
+
+    def send_json(self, body):
+        self.send_body(json.dumps(body).encode(), "application/json")
+
+    def send_body(self, data, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        #keep load test output clean
+        pass
+
+'''
+App Server Setup
+'''
+def write_fake_secrets(folder):
+    os.makedirs(os.path.join(folder, "secrets"))
+    with open(os.path.join(folder, "secrets", "token.json"), "w") as f:
+        json.dump({"token": "fake", "refresh_token": "fake", "client_id": "fake", "client_secret": "fake",
+                   "scopes": ["https://www.googleapis.com/auth/calendar.readonly"], "expiry": "2099-01-01T00:00:00Z"}, f)
+    with open(os.path.join(folder, "secrets", ".spotify_token.json"), "w") as f:
+        json.dump({"access_token": "fake", "refresh_token": "fake", "token_type": "Bearer", "expires_in": 3600,
+                   "expires_at": 4070908800, "scope": "user-read-playback-state user-read-currently-playing"}, f)
+
+def start_app(server, folder, upstream):
+    env = dict(os.environ,
+               PYTHONPATH=REPO,
+               CLIENT_ID="fake", CLIENT_SECRET="fake",
+               STOCK_API_URL=f"{upstream}/alphavantage/query",
+               SPORTS_API_URL=f"{upstream}/sportradar",
+               CALENDAR_DISCOVERY_URL=f"{upstream}/discovery/{{api}}/{{apiVersion}}",
+               SPOTIFY_API_URL=f"{upstream}/spotify/",
+               CACHE_PATH=os.path.join(folder, "cache", "mirror_cache.db"),
+               STOCK_HISTORY_PATH=os.path.join(folder, "cache", "stock_history.db"),
+               MIRROR_BIND="127.0.0.1:5000")
+    if server == "gunicorn":
+        command = ["gunicorn", "-c", os.path.join(REPO, "gunicorn.conf.py"), "--chdir", folder, "app:app"]
+    elif server == "asgi":
+        command = [sys.executable, "-m", "uvicorn", "asgi:app", "--app-dir", REPO,
+                   "--host", "127.0.0.1", "--port", "5000", "--no-access-log"]
+    else:
+        command = [sys.executable, os.path.join(REPO, "app.py")]
+    process = subprocess.Popen(command, cwd=folder, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    #wait until the server answers
+    for _ in range(100):
+        try:
+            requests.get("http://127.0.0.1:5000/current_page", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("app server did not start")
+
+'''
+Load Generator
+'''
+def client(url, deadline, latencies, errors):
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=10)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except requests.RequestException as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+def load_route(base, route, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client, base + route, deadline, latencies, errors)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / duration, p50, p99, len(errors)
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Mirror load test")
+    parser.add_argument("--server", choices=["gunicorn", "dev", "asgi"], default="gunicorn")
+    parser.add_argument("--url", help="test an already running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--mock-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    global mock_latency
+    mock_latency = args.mock_latency
+
+    upstream_server = ThreadingHTTPServer(("127.0.0.1", 0), FakeUpstreams)
+    threading.Thread(target=upstream_server.serve_forever, daemon=True).start()
+
+    process = None
+    base = args.url
+    if base is None:
+        folder = tempfile.mkdtemp()
+        write_fake_secrets(folder)
+        process = start_app(args.server, folder, f"http://127.0.0.1:{upstream_server.server_port}")
+        base = "http://127.0.0.1:5000"
+
+    try:
+        #warm every cache once so the numbers are steady-state
+        for route in ROUTES:
+            requests.get(base + route, timeout=30)
+
+        print(f"server: {args.url or args.server}, {args.concurrency} clients, {args.duration:.0f} s per route")
+        print(f"{'route':<18} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'errors':>7}")
+        for route in ROUTES:
+            rps, p50, p99, errors = load_route(base, route, args.concurrency, args.duration)
+            print(f"{route:<18} {rps:>8.0f} {p50 * 1000:>9.1f} {p99 * 1000:>9.1f} {errors:>7}")
+    finally:
+        if process is not None:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=15)
+        upstream_server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,37 @@
 #!/bin/bash
 
-#Script to restart flask while disabling cache for css updates
+#Script to reload the server and the mirror page after code, template or css updates
+#(no cache clearing needed: the server rebuilds static/dist/ with new hashed names on reload)
 
-echo "Freeing port 5000"
-fuser -k 5000/tcp > /dev/null 2>&1
+PIDFILE=/tmp/smart-mirror-gunicorn.pid
 
 echo "Killing all Chromium Processes"
 pkill chromium-browser
 
 sleep 1
 
-echo "Clearing cache"
-rm -rf ~/.cache/chromium
-
-echo "Killing current Flask"
-pkill -f "flask run"
-
-sleep 1
-
-echo "Exporting Flask"
 cd /home/pi/smart-mirror
-export FLASK_APP=app
 
-echo "Starting Flask"
-flask run --host=0.0.0.0 > /home/pi/smart-mirror/flask.log 2>&1 &
+if [ -f "$PIDFILE" ] && kill -0 "$(cat $PIDFILE)" 2>/dev/null; then
+  #graceful reload: new workers load the new code, old ones finish their requests first
+  echo "Reloading server"
+  kill -HUP "$(cat $PIDFILE)"
+else
+  echo "Freeing port 5000"
+  fuser -k 5000/tcp > /dev/null 2>&1
+
+  echo "Starting server"
+  gunicorn -c gunicorn.conf.py app:app > /home/pi/smart-mirror/flask.log 2>&1 &
+fi
 
 sleep 2
 
-echo "Restarting Chromium (no cache)"
+#pkill counts as a crash, stop Chromium from showing the restore-pages bubble on the mirror
+sed -i 's/"exited_cleanly":false/"exited_cleanly":true/; s/"exit_type":"Crashed"/"exit_type":"Normal"/' ~/.config/chromium/Default/Preferences 2>/dev/null
+
+echo "Restarting Chromium"
 DISPLAY=:0 chromium-browser \
   --kiosk \
-  --incognito \
-  --disk-cache-size=1 \
-  --disable-application-cache \
-  --disable-cache \
-  --disable-offline-load-stale-cache \
-  --disable-gpu-program-cache \
+  --noerrdialogs \
+  --disable-session-crashed-bubble \
   http://localhost:5000/mirror &
\ No newline at end of file
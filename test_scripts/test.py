@@ -11,14 +11,12 @@ import adafruit_dotstar
 dots = adafruit_dotstar.DotStar(board.SCLK, board.MOSI, 72, brightness=0.5, auto_write=False)
 
 #turn the leds to white
-for i in range(72):
-    dots[i] = (255, 255, 255)
+dots.fill((255, 255, 255))
 dots.show()
 
 #wait 2 seconds
 time.sleep(2)
 
 #turn to black (turn off)
-for i in range(72):
-    dots[i] = (0, 0, 0)
+dots.fill((0, 0, 0))
 dots.show()
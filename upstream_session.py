@@ -0,0 +1,64 @@
+'''
+Shared Upstream HTTP Session
+1. One requests.Session is used for every upstream call (Alpha Vantage, Sportradar, Spotify, Google token refresh)
+2. Keep-alive: the TCP + TLS connection to each host is opened once and reused by every refresh after that
+3. Each host gets its own connection pool, sized for how many calls it gets at the same time
+4. Failed calls are retried with exponential backoff: connection errors and the status codes each host says are worth retrying
+   - Retry-After sent by the server is honoured
+   - after the last retry the final response is returned as is, so callers still see the real status code
+   - hosts with a call budget (quota.py) use retries=0: every attempt counts against the budget but only one is charged
+5. app.py opens the session once and mounts a HostPolicy for each upstream in that upstream's section
+'''
+
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+'''
+HostPolicy
+
+pool_size: connections kept alive to this host (match it to the most calls made at once)
+retries: extra attempts after the first call, backoff: base delay in seconds (0.5 -> 0.5, 1, 2, ...)
+retry_statuses: HTTP status codes worth retrying, methods: HTTP methods that are safe to repeat
+'''
+class HostPolicy:
+    def __init__(self, pool_size=2, retries=2, backoff=0.5, retry_statuses=(500, 502, 503, 504), methods=('GET',)):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_statuses = retry_statuses
+        self.methods = methods
+
+    def adapter(self):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=self.retry_statuses,
+            allowed_methods=frozenset(self.methods),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        return HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+
+'''
+open_upstream_session
+
+default: policy for any host without its own policy
+'''
+def open_upstream_session(default=None):
+    session = requests.Session()
+    default = default or HostPolicy()
+    session.mount("https://", default.adapter())
+    session.mount("http://", default.adapter())
+    return session
+
+'''
+mount_host
+
+gives the host of url its own pool and retry policy (url can be any URL on that host, ex. the API base URL)
+'''
+def mount_host(session, url, policy):
+    parts = urlsplit(url)
+    session.mount(f"{parts.scheme}://{parts.netloc}/", policy.adapter())